@@ -2,13 +2,42 @@ import sys
 from lox.Scanner import *  
 from lox.Parser import *
 from lox.Resolver import *
+from lox.Optimizer import *
 from lox.Interpreter import *
+from lox.VM import *
+from lox.Cache import *
+from lox.InlineCache import *
+from lox.Profiler import *
+from lox.PyLoxExceptions import PyLoxScanError
    
 class Lox :
     _hadError = False
     _hadRuntimeError = False
+    _useCache = True #resolved scripts are cached in __ploxcache__ directories
+    _chunkSize = 1 << 16 #characters read at once from script files
+    _useStream = False #top-level declarations are executed as soon as they are parsed
+    _profiler = None #measures the time spent by the script in its functions and lines
+    _stacksPath = None #file where the profiler writes the collapsed call stacks
     _interpreter = Interpreter()
     _resolver = Resolver(_interpreter)
+    _optimizer = Optimizer(_interpreter)
+    
+    #available execution engines
+    _engines = {
+        "tree"    : (lambda : Interpreter()),
+        "closure" : (lambda : Interpreter(compiled = True)),
+        "vm"      : (lambda : VM())
+    }
+    
+    @classmethod
+    def useEngine(cls, engine : str) -> bool:
+        #selects the engine that executes the resolved statements
+        if engine not in cls._engines : return False
+        
+        cls._interpreter = cls._engines[engine]()
+        cls._resolver = Resolver(cls._interpreter)
+        cls._optimizer = Optimizer(cls._interpreter)
+        return True
     
     @classmethod
     def _hasAnyError(cls, step : object) -> bool :
@@ -19,13 +48,22 @@ class Lox :
     @classmethod
     def runFile(cls, path : str) -> None: 
         try :
+            cache = Cache(path) if cls._useCache and not cls._useStream else None
+            if cls._profiler is not None : cls._profiler.start(cls._interpreter)
             with open(path, "r") as reader :
-                cls.buffer = reader.read()
-                cls._run(cls.buffer)
+                #the file is read in chunks, as the Scanner needs them
+                chunks = iter(lambda : reader.read(cls._chunkSize), "")
+                if cls._useStream : cls._stream(chunks)
+                else : cls._run(chunks, cache)
         
         except FileNotFoundError :
             print("Error: Could not open file '{}': file not found.".format(path)) 
         else :
+            if InlineCache.stats : InlineCache.report()
+            if cls._profiler is not None :
+                cls._profiler.stop()
+                cls._profiler.report()
+                if cls._stacksPath is not None : cls._profiler.writeStacks(cls._stacksPath)
             if cls._hadError : sys.exit(65)
             if cls._hadRuntimeError : sys.exit(70)
         
@@ -38,38 +76,107 @@ class Lox :
             cls._hadError = False
     
     @classmethod
-    def _run(cls, source : str) -> None:
-        scanner = Scanner(source)
-        tokens = scanner.Tokenize() #step 1
+    def _run(cls, source : iter, cache : Cache = None) -> None:
+        #on a cache hit, the resolved statements are loaded instead of analyzing the source again,
+        #with the names of the global slots they were resolved to
+        statements = None
+        if cache is not None :
+            cached = cache.load()
+            if cached is not None and cls._interpreter.globals.restore(cached[0]) : statements = cached[1]
+        
+        if statements is None :
+            statements = cls._analyze(source)
+            if statements is None : return
+            
+            if cache is not None : cache.store((cls._interpreter.globals.names(), statements))
+        
+        cls._interpreter.Interpret(statements) #step 4
+        
+        if cls._hasAnyError(cls._interpreter) :
+           cls._hadRuntimeError = True; return        
+    
+    @classmethod
+    def _stream(cls, source : iter) -> None:
+        #resolves and interprets each top-level declaration as soon as it is parsed,
+        #so that the output of a script starts before the rest of it is read
+        try :
+            parser = Parser(Scanner(source).Scan())
+            
+            for statement in parser.Declarations() :
+                cls._resolver.Resolve(statement)
+                
+                #after a static error, the rest of the script is still analyzed to report its errors, but not executed
+                if cls._hasAnyError(parser) or cls._hasAnyError(cls._resolver) :
+                    cls._hadError = True; continue
+                
+                statement = cls._optimizer.Optimize(statement)
+                if statement is None : continue
+                
+                if not cls._interpreter.Interpret([statement]) :
+                    cls._hadRuntimeError = True; return
         
-        if cls._hasAnyError(scanner) :
+        except PyLoxScanError as error :
+            error.what()
             cls._hadError = True; return
         
-        parser = Parser(tokens)
-        statements = parser.Parse() #step 2
+        if cls._hasAnyError(parser) : cls._hadError = True
+        if cls._hasAnyError(cls._interpreter) : cls._hadRuntimeError = True
+    
+    @classmethod
+    def _analyze(cls, source : iter) -> list:
+        #returns the resolved statements of source, a string or an iterable of its chunks, 
+        #or None if there is any error
+        scanner = Scanner(source)
+        
+        try :
+            #steps 1 and 2, tokens are scanned as the parser consumes them
+            parser = Parser(scanner.Scan())
+            statements = parser.Parse()
+        
+        except PyLoxScanError as error :
+            error.what()
+            cls._hadError = True; return None
         
         if cls._hasAnyError(parser) :
-            cls._hadError = True; return
+            cls._hadError = True; return None
         
         for statement in statements : 
             cls._resolver.Resolve(statement) #step 3
         
         if cls._hasAnyError(cls._resolver) :
-            cls._hadError = True; return
+            cls._hadError = True; return None
         
-        cls._interpreter.Interpret(statements) #step 4
-        
-        if cls._hasAnyError(cls._interpreter) :
-           cls._hadRuntimeError = True; return        
+        #step 3.5, statements without any effect are dropped
+        statements = [cls._optimizer.Optimize(statement) for statement in statements]
+        return [statement for statement in statements if statement is not None]
          
 if __name__ == "__main__" :
-
-     if len(sys.argv) > 2 : 
-        print ("Usage PyLox [script]")
+     
+     options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+     args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+     
+     for option in options :
+        if option == "--no-cache" :
+            Lox._useCache = False
+        elif option == "--stream" :
+            Lox._useStream = True
+        elif option == "--ic-stats" :
+            InlineCache.stats = True #reports the inline caches of property accesses when the script ends
+        elif option == "--profile" or option.startswith("--profile=") :
+            Lox._profiler = Profiler()
+            if option != "--profile" : Lox._stacksPath = option[len("--profile="):]
+        elif option.startswith("--max-depth=") and option[len("--max-depth="):].isdigit() :
+            VM.maxDepth = int(option[len("--max-depth="):]) #Lox calls active at once in the vm engine
+        elif not option.startswith("--engine=") or not Lox.useEngine(option[len("--engine="):]) :
+            print ("Usage PyLox [--engine=tree|closure|vm] [--no-cache] [--stream] [--ic-stats] [--profile[=stacks file]] [--max-depth=N] [script]")
+            sys.exit(64)
+     
+     if len(args) > 1 : 
+        print ("Usage PyLox [--engine=tree|closure|vm] [--no-cache] [--stream] [--ic-stats] [--profile[=stacks file]] [--max-depth=N] [script]")
         sys.exit(64)
         
-     elif len(sys.argv) == 2 :
-        Lox.runFile(sys.argv[1])
+     elif len(args) == 1 :
+        Lox.runFile(args[0])
      
      else :
         Lox.runPrompt()
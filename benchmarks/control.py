@@ -0,0 +1,95 @@
+"""
+    Measures the cost of the statements that transfer the control : return, break and continue.
+
+    Each program runs in every execution engine, and the best time of a few runs is reported.
+
+    usage : python3 benchmarks/control.py [--repeat=N] [--engine=tree|closure|vm ...]
+"""
+import io
+import os
+import sys
+import time
+import contextlib
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root)
+
+from PyLox import Lox
+
+programs = {
+    #every call returns through a return statement
+    "recursive fib" : """
+        fun fib(n) {
+            if (n < 2) return n;
+            return fib(n - 1) + fib(n - 2);
+        }
+        print fib(22);
+    """,
+
+    #the inner loop is left by break, and skips half of its iterations with continue
+    "loop with break" : """
+        var total = 0;
+        var i = 0;
+        while (i < 3000) {
+            var j = 0;
+            while (true) {
+                j = j + 1;
+                if (j > 40) break;
+                if (j % 2 == 0) continue;
+                total = total + j;
+            }
+            i = i + 1;
+        }
+        print total;
+    """,
+
+    #returns from inside nested loops and blocks
+    "early return" : """
+        fun find(limit) {
+            var i = 0;
+            while (true) {
+                {
+                    var j = i * 2;
+                    if (j >= limit) return i;
+                }
+                i = i + 1;
+            }
+        }
+        var sum = 0;
+        var k = 0;
+        while (k < 2000) {
+            sum = sum + find(20);
+            k = k + 1;
+        }
+        print sum;
+    """
+}
+
+def measure(engine : str, source : str, repeat : int) -> float:
+    best = None
+    for _ in range(repeat) :
+        Lox.useEngine(engine)
+        with contextlib.redirect_stdout(io.StringIO()) :
+            start = time.perf_counter()
+            Lox._run(source)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == "__main__" :
+    engines = []
+    repeat = 3
+    for option in sys.argv[1:] :
+        if option.startswith("--repeat=") : repeat = int(option[len("--repeat="):])
+        elif option.startswith("--engine=") and option[len("--engine="):] in Lox._engines :
+            engines.append(option[len("--engine="):])
+        else :
+            print("Usage control.py [--repeat=N] [--engine=tree|closure|vm ...]")
+            sys.exit(64)
+
+    if not engines : engines = list(Lox._engines)
+
+    print("{:<20}".format("program") + "".join("{:>12}".format(engine) for engine in engines))
+
+    for name, source in programs.items() :
+        print("{:<20}".format(name) + "".join("{:>11.3f}s".format(measure(engine, source, repeat)) for engine in engines))
@@ -0,0 +1,137 @@
+"""
+    Measures the memory taken by PyLox instances, in bytes per instance, and the time of their field accesses.
+
+    Instances are created and filled with fields in two ways : with lox.PyLoxInstance,
+    that keeps its field values in a list, laid out by a shape shared with the other instances of the class,
+    and with an equivalent class that keeps its fields in a per-instance dict, as it did before.
+    Fields are read and written by name, with the get and set methods of the instances, and at the access site,
+    as the closure and vm engines do : with the dict, by looking the name up in the fields,
+    and with shapes, by checking the first shape of the inline cache of the site before taking its lookup.
+    Each time is the best of 5 runs.
+
+    usage : python3 benchmarks/instances.py [--instances=N] [--fields=N]
+
+    by default, it creates 100000 instances of 5 fields, like the Employee class of tests/t6.plox.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root)
+
+from lox.Token import Token, TokenType
+from lox.PyLoxClass import PyLoxClass
+from lox.PyLoxInstance import PyLoxInstance
+from lox.InlineCache import InlineCache
+
+class DictInstance :
+    #field storage of PyLoxInstance before shapes, with the same interface
+    def __init__(self, klass) :
+        self._klass = klass
+        self._fields = {}
+
+    def get(self, name : Token) :
+        if name.lexeme in self._fields :
+            return self._fields[name.lexeme]
+        return self._klass.findMethod(name.lexeme).bind(self)
+
+    def set(self, name : Token, value : object) :
+        self._fields[name.lexeme] = value
+
+def create(instanceClass, klass, names : list, count : int) -> list:
+    instances = []
+    for i in range(count) :
+        instance = instanceClass(klass)
+        for name in names :
+            instance.set(name, float(i))
+        instances.append(instance)
+    return instances
+
+def best(function, instances : list, names : list) -> float:
+    #returns the best time of 5 runs of function over the instances
+    times = []
+    for _ in range(5) :
+        start = time.perf_counter()
+        function(instances, names)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def readByName(instances : list, names : list) -> None:
+    for instance in instances :
+        for name in names :
+            instance.get(name)
+
+def writeByName(instances : list, names : list) -> None:
+    for instance in instances :
+        for name in names :
+            instance.set(name, 0.0)
+
+def readDictAtSite(instances : list, names : list) -> None:
+    lexemes = [name.lexeme for name in names]
+    for instance in instances :
+        for lexeme in lexemes :
+            fields = instance._fields
+            if lexeme in fields : value = fields[lexeme]
+            else : value = instance.get(lexeme)
+
+def writeDictAtSite(instances : list, names : list) -> None:
+    lexemes = [name.lexeme for name in names]
+    for instance in instances :
+        for lexeme in lexemes :
+            instance._fields[lexeme] = 0.0
+
+def readShapeAtSite(instances : list, caches : list) -> None:
+    for instance in instances :
+        for cache in caches :
+            if instance._shape is cache.shape : value = instance._values[cache.entry]
+            else : value = cache.get(instance)
+
+def writeShapeAtSite(instances : list, caches : list) -> None:
+    for instance in instances :
+        for cache in caches :
+            if instance._shape is cache.shape : instance._values[cache.entry] = 0.0
+            else : cache.set(instance, 0.0)
+
+def measure(instanceClass, names : list, count : int, atSite : bool = False) -> tuple:
+    #returns the bytes per instance, and the nanoseconds per field read and per field write,
+    #made by name, or at the access site as the engines do
+    klass = PyLoxClass("Employee", None, {})
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    instances = create(instanceClass, klass, names, count)
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    if not atSite :
+        reads = best(readByName, instances, names)
+        writes = best(writeByName, instances, names)
+    elif instanceClass is DictInstance :
+        reads = best(readDictAtSite, instances, names)
+        writes = best(writeDictAtSite, instances, names)
+    else :
+        reads = best(readShapeAtSite, instances, [InlineCache(name, "get") for name in names])
+        writes = best(writeShapeAtSite, instances, [InlineCache(name, "set") for name in names])
+
+    accesses = count * len(names)
+    return size / count, 1e9 * reads / accesses, 1e9 * writes / accesses
+
+if __name__ == "__main__" :
+    count = 100000
+    fields = 5
+    for option in sys.argv[1:] :
+        if option.startswith("--instances=") : count = int(option[len("--instances="):])
+        elif option.startswith("--fields=") : fields = int(option[len("--fields="):])
+        else :
+            print("Usage instances.py [--instances=N] [--fields=N]")
+            sys.exit(64)
+
+    names = [Token(TokenType.IDENTIFIER, "field{}".format(i), None, 1) for i in range(fields)]
+
+    print("{:<16} {:>12} {:>12} {:>12}".format("storage", "B/instance", "ns/read", "ns/write"))
+    for label, instanceClass, atSite in (("dict", DictInstance, False), ("dict, at site", DictInstance, True),
+                                         ("shape", PyLoxInstance, False), ("shape, at site", PyLoxInstance, True)) :
+        size, read, write = measure(instanceClass, names, count, atSite)
+        print("{:<16} {:>12.1f} {:>12.1f} {:>12.1f}".format(label, size, read, write))
@@ -0,0 +1,138 @@
+"""
+    Measures the memory taken by the syntax tree of PyLox programs, in bytes per node.
+
+    Each program is parsed twice, each time in a python process of its own : by the lox package of the working tree,
+    whose node classes keep their fields in __slots__, and by the lox package of a baseline revision,
+    extracted from git, whose nodes keep the fields they had then in a per-instance __dict__.
+    The baseline is by default the revision before __slots__ were added to lox/Expr.py,
+    a program that the baseline cannot parse is reported with a '-'.
+
+    usage : python3 benchmarks/memory.py [--nodes=N] [--baseline=REV] [script.plox ...]
+
+    by default, it measures the tests/*.plox scripts and a synthetic program of about 1000000 nodes.
+"""
+import os
+import io
+import sys
+import glob
+import tarfile
+import tempfile
+import subprocess
+import tracemalloc
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def countNodes(statements : list) -> int:
+    #counts the instances of the classes of lox.Expr and lox.Stmt reachable from statements
+    count = 0
+    stack = list(statements)
+    while stack :
+        node = stack.pop()
+        if isinstance(node, (list, tuple)) :
+            stack.extend(node)
+        elif type(node).__module__ in ("lox.Expr", "lox.Stmt") :
+            count += 1
+            if hasattr(node, "__dict__") :
+                stack.extend(vars(node).values())
+            else :
+                stack.extend(getattr(node, field) for cls in type(node).__mro__ for field in getattr(cls, "__slots__", ()))
+    return count
+
+def measure(path : str) -> tuple:
+    #returns the number of nodes and the bytes allocated while parsing the tokens of the script at path,
+    #with the lox package found first on sys.path, or None if it cannot parse the script
+    from lox.Scanner import Scanner
+    from lox.Parser import Parser
+
+    with open(path, "r") as reader :
+        tokens = Scanner(reader.read()).Tokenize()
+
+    parser = Parser(tokens)
+    tracemalloc.start()
+    statements = parser.Parse()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    if parser._hadError : return None
+    return countNodes(statements), size
+
+def run(root : str, path : str) -> tuple:
+    #measures the script at path in a new process, with the lox package of root
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure=" + root, path],
+                            stdout = subprocess.PIPE, universal_newlines = True)
+    lines = result.stdout.splitlines()
+    if result.returncode != 0 or not lines or lines[-1] == "error" : return None
+    return tuple(int(field) for field in lines[-1].split())
+
+def baselineRevision() -> str:
+    #returns the parent of the oldest commit adding __slots__ to lox/Expr.py
+    commits = subprocess.check_output(["git", "log", "--format=%H", "-S__slots__", "--", "lox/Expr.py"],
+                                      cwd = _root, universal_newlines = True).split()
+    if not commits : return "HEAD"
+    return commits[-1] + "^"
+
+def extract(revision : str, directory : str) -> None:
+    #writes the lox package of revision into directory
+    archive = subprocess.check_output(["git", "archive", revision, "lox"], cwd = _root)
+    with tarfile.open(fileobj = io.BytesIO(archive)) as reader :
+        reader.extractall(directory)
+
+def synthetic(nodes : int, path : str) -> None:
+    #writes to path a program with at least 'nodes' syntax tree nodes
+    template = "var v{0} = (v{1} + {0}) * 2 - v{1} / 3;\n"
+    perStatement = 11 #var, -, *, (), +, /, 2 reads and 3 literals
+
+    with open(path, "w") as writer :
+        writer.write("var v0 = 0;\n")
+        for i in range(1, nodes // perStatement + 1) :
+            writer.write(template.format(i, i - 1))
+
+def report(name : str, path : str, baseline : str) -> None:
+    before = run(baseline, path)
+    after = run(_root, path)
+
+    if after is None :
+        print("{:<24} cannot be parsed".format(name))
+    elif before is None :
+        print("{:<24} {:>9} {:>16} {:>16.1f} {:>9}".format(name, after[0], "-", after[1] / after[0], "-"))
+    else :
+        print("{:<24} {:>9} {:>16.1f} {:>16.1f} {:>8.1f}%".format(name, after[0], before[1] / before[0], after[1] / after[0],
+                                                               100.0 * (before[1] / before[0] - after[1] / after[0]) / (before[1] / before[0])))
+
+if __name__ == "__main__" :
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    scripts = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+
+    if options and options[0].startswith("--measure=") :
+        sys.path.insert(0, options[0][len("--measure="):])
+        result = measure(scripts[0])
+        print("error" if result is None else "{} {}".format(*result))
+        sys.exit(0)
+
+    nodes = 1000000
+    revision = None
+    for option in options :
+        if option.startswith("--nodes=") : nodes = int(option[len("--nodes="):])
+        elif option.startswith("--baseline=") : revision = option[len("--baseline="):]
+        else :
+            print("Usage memory.py [--nodes=N] [--baseline=REV] [script.plox ...]")
+            sys.exit(64)
+
+    if not scripts :
+        scripts = sorted(glob.glob(os.path.join(_root, "tests", "*.plox")))
+
+    with tempfile.TemporaryDirectory() as directory :
+        revision = revision or baselineRevision()
+        baseline = os.path.join(directory, "baseline")
+        extract(revision, baseline)
+        print("baseline : {}".format(revision))
+
+        print("{:<24} {:>9} {:>16} {:>16} {:>9}".format("program", "nodes", "__dict__ B/node", "__slots__ B/node", "saved"))
+
+        for path in scripts :
+            report(os.path.relpath(path, _root), path, baseline)
+
+        if nodes > 0 :
+            path = os.path.join(directory, "synthetic.plox")
+            synthetic(nodes, path)
+            report("synthetic", path, baseline)
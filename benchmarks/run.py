@@ -0,0 +1,169 @@
+"""
+    Runs the Lox workloads of benchmarks/lox, to measure PyLox across commits.
+
+    Each workload runs N times in a new process for every engine, without the cache of resolved scripts.
+    The report gives the best and mean wall time of the runs, the operations per second of the best run,
+    and the peak resident memory of the process. The first line of each workload declares its operations,
+    as '//ops : <count> <unit>'. Every engine must print the same output, or the workload is reported as failed.
+    The peak memory is not measured on Windows, and before python 3.9 it is the largest peak of the runs made so far.
+
+    The results can be saved as JSON, and compared with the results saved for another commit.
+
+    usage : python3 benchmarks/run.py [--repeat=N] [--engine=tree|closure|vm ...] [--json=FILE] [--compare=FILE]
+                                      [workload ...]
+
+    by default, it runs every workload 3 times in every engine.
+"""
+import os
+import re
+import sys
+import json
+import glob
+import time
+import platform
+import subprocess
+
+try :
+    import resource
+except ImportError :
+    resource = None #not available on Windows, where the peak memory is not measured
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_workloads = os.path.join(_root, "benchmarks", "lox")
+_engines = ["tree", "closure", "vm"]
+
+def operations(path : str) -> tuple:
+    #returns the operations declared by the first line of a workload, as (count, unit)
+    with open(path, "r") as reader :
+        match = re.match(r"//\s*ops\s*:\s*(\d+)\s*(\w*)", reader.readline())
+    return (int(match.group(1)), match.group(2) or "ops") if match else (None, "ops")
+
+def runOnce(path : str, engine : str) -> tuple:
+    #returns the wall time, the peak resident memory in KB or None, the exit status and the output of a run
+    command = [sys.executable, os.path.join(_root, "PyLox.py"), "--no-cache", "--engine=" + engine, path]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout = subprocess.PIPE, stderr = subprocess.STDOUT)
+    output = process.stdout.read()
+    process.stdout.close()
+
+    if hasattr(os, "wait4") and hasattr(os, "waitstatus_to_exitcode") :
+        #POSIX, with python >= 3.9 : the memory of this process only
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        peak = usage.ru_maxrss
+    else :
+        process.wait()
+        elapsed = time.perf_counter() - start
+        #the largest peak of the processes run so far, as every run is a child of this one
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss if resource is not None else None
+
+    #ru_maxrss is in bytes on macOS, and in KB elsewhere
+    if peak is not None and sys.platform == "darwin" : peak //= 1024
+    return elapsed, peak, process.returncode, output
+
+def measure(path : str, engine : str, repeat : int) -> dict:
+    times = []
+    peak = 0
+    output = None
+    for _ in range(repeat) :
+        elapsed, rss, status, output = runOnce(path, engine)
+        if status != 0 :
+            return {"engine" : engine, "error" : output.decode(errors = "replace").strip().splitlines()[-1:]}
+        times.append(elapsed)
+        peak = None if rss is None else max(peak, rss)
+
+    count, unit = operations(path)
+    return {
+        "engine" : engine,
+        "runs" : repeat,
+        "best" : min(times),
+        "mean" : sum(times) / len(times),
+        "ops" : count,
+        "unit" : unit,
+        "ops_per_sec" : None if count is None else count / min(times),
+        "peak_rss_kb" : peak,
+        "output" : output.decode(errors = "replace")
+    }
+
+def commit() -> str:
+    #returns the commit of the measured tree, if it is a git checkout
+    try :
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd = _root, stdout = subprocess.PIPE,
+                              stderr = subprocess.PIPE, universal_newlines = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError) :
+        return None
+
+def load(path : str) -> dict:
+    #returns the best time of each workload and engine saved in a JSON file
+    with open(path, "r") as reader :
+        saved = json.load(reader)
+    return {(result["workload"], result["engine"]) : result["best"]
+            for result in saved["results"] if "best" in result}
+
+if __name__ == "__main__" :
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    names = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+
+    repeat = 3
+    engines = []
+    jsonPath = None
+    baseline = None
+    for option in options :
+        if option.startswith("--repeat=") : repeat = int(option[len("--repeat="):])
+        elif option.startswith("--engine=") and option[len("--engine="):] in _engines :
+            engines.append(option[len("--engine="):])
+        elif option.startswith("--json=") : jsonPath = option[len("--json="):]
+        elif option.startswith("--compare=") : baseline = load(option[len("--compare="):])
+        else :
+            print("Usage run.py [--repeat=N] [--engine=tree|closure|vm ...] [--json=FILE] [--compare=FILE] [workload ...]")
+            sys.exit(64)
+
+    if not engines : engines = _engines
+    paths = sorted(glob.glob(os.path.join(_workloads, "*.plox")))
+    if names :
+        paths = [path for path in paths if os.path.splitext(os.path.basename(path))[0] in names]
+
+    print("{:<10} {:<8} {:>9} {:>9} {:>12} {:<15} {:>10} {:>9}".format("workload", "engine", "best s", "mean s",
+                                                                     "ops/s", "", "peak KB", "baseline"))
+    results = []
+    failed = False
+    for path in paths :
+        workload = os.path.splitext(os.path.basename(path))[0]
+        outputs = set()
+
+        for engine in engines :
+            result = measure(path, engine, repeat)
+            result["workload"] = workload
+            results.append(result)
+
+            if "error" in result :
+                failed = True
+                print("{:<10} {:<8} failed : {}".format(workload, engine, " ".join(result["error"])))
+                continue
+            outputs.add(result.pop("output"))
+
+            ratio = "-"
+            if baseline is not None and (workload, engine) in baseline :
+                ratio = "{:.2f}x".format(baseline[(workload, engine)] / result["best"])
+            print("{:<10} {:<8} {:>9.3f} {:>9.3f} {:>12} {:<15} {:>10} {:>9}".format(workload, engine,
+                  result["best"], result["mean"],
+                  "-" if result["ops_per_sec"] is None else "{:.0f}".format(result["ops_per_sec"]), result["unit"],
+                  "-" if result["peak_rss_kb"] is None else result["peak_rss_kb"], ratio))
+
+        if len(outputs) > 1 :
+            failed = True
+            print("{:<10} the engines printed different outputs".format(workload))
+
+    if jsonPath is not None :
+        with open(jsonPath, "w") as writer :
+            json.dump({
+                "commit" : commit(),
+                "date" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python" : platform.python_version(),
+                "platform" : platform.platform(),
+                "repeat" : repeat,
+                "results" : results
+            }, writer, indent = 2)
+
+    if failed : sys.exit(1)
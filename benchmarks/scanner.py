@@ -0,0 +1,76 @@
+"""
+    Measures the speed of the Scanner, in tokens per second.
+
+    Each program is tokenized in both scanning modes : character by character,
+    and with the master pattern of the fast mode, checking that they produce the same tokens.
+
+    usage : python3 benchmarks/scanner.py [--lines=N] [--repeat=N] [script.plox ...]
+
+    by default, it measures the tests/*.plox scripts and a synthetic program of 100000 lines.
+"""
+import os
+import sys
+import glob
+import time
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _root)
+
+from lox.Scanner import Scanner
+
+def tokens(source : str, fast : bool) -> list:
+    return [(token.tokenValue, token.lexeme, token.literal, token.line) for token in Scanner(source, fast).Tokenize()]
+
+def measure(source : str, fast : bool, repeat : int) -> tuple:
+    #returns the number of tokens of source and the best time taken to tokenize it
+    best = None
+    for _ in range(repeat) :
+        start = time.perf_counter()
+        count = len(Scanner(source, fast).Tokenize())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+def synthetic(lines : int) -> str:
+    #generates a program that exercises every kind of token
+    template = ("fun f{0}(a, b) {{ // comment {0}\n"
+                "    var s = \"string {0}\"; /* block\n comment */\n"
+                "    if (a >= {0}.5 and b != nil or !true) {{ return a * b - {0} % 3; }}\n"
+                "    return this.field <= super.method(a / 2, s == \"x\") ? a : b;\n"
+                "}}\n")
+    return "".join(template.format(i) for i in range(lines // 5 + 1))
+
+def report(name : str, source : str, repeat : int) -> None:
+    if tokens(source, True) != tokens(source, False) :
+        print("{:<24} the scanning modes produced different tokens".format(name))
+        return
+
+    count, legacy = measure(source, False, repeat)
+    count, fast = measure(source, True, repeat)
+
+    print("{:<24} {:>9} {:>16.0f} {:>16.0f} {:>8.1f}x".format(name, count, count / legacy, count / fast, legacy / fast))
+
+if __name__ == "__main__" :
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    scripts = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+
+    lines = 100000
+    repeat = 3
+    for option in options :
+        if option.startswith("--lines=") : lines = int(option[len("--lines="):])
+        elif option.startswith("--repeat=") : repeat = int(option[len("--repeat="):])
+        else :
+            print("Usage scanner.py [--lines=N] [--repeat=N] [script.plox ...]")
+            sys.exit(64)
+
+    if not scripts :
+        scripts = sorted(glob.glob(os.path.join(_root, "tests", "*.plox")))
+
+    print("{:<24} {:>9} {:>16} {:>16} {:>9}".format("program", "tokens", "legacy tokens/s", "fast tokens/s", "speedup"))
+
+    for path in scripts :
+        with open(path, "r") as reader :
+            report(os.path.relpath(path, _root), reader.read(), repeat)
+
+    if lines > 0 :
+        report("synthetic", synthetic(lines), repeat)
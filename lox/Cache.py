@@ -0,0 +1,63 @@
+import os
+import sys
+import pickle
+import hashlib
+
+__all__ = ["Cache"]
+
+"""
+    The Cache keeps the resolved syntax tree of a script in a .ploxc file, with the names of its global slots,
+    inside a __ploxcache__ directory next to the script.
+    When the script has not changed, its statements are loaded from there,
+    and it is neither scanned, parsed nor resolved again.
+"""
+
+class Cache :
+    #must be incremented whenever the syntax tree or the results stored by the Resolver change
+    VERSION = 11
+
+    _directory = "__ploxcache__"
+    _magic = b"PLOXC"
+    _chunkSize = 1 << 16
+
+    def __init__(self, path : str) :
+        directory, name = os.path.split(os.path.abspath(path))
+        self._path = os.path.join(directory, Cache._directory, os.path.splitext(name)[0] + ".ploxc")
+
+        #the key changes with the script, the cache format and the python version that pickled it
+        key = hashlib.sha256()
+        key.update("{} {}.{}\n".format(Cache.VERSION, *sys.version_info[:2]).encode())
+        with open(path, "rb") as reader :
+            for chunk in iter(lambda : reader.read(Cache._chunkSize), b"") :
+                key.update(chunk)
+        self._key = key.digest()
+
+    def load(self) -> list:
+        #returns the cached program, or None if there is no valid cache for the source
+        try :
+            with open(self._path, "rb") as reader :
+                if reader.read(len(Cache._magic)) != Cache._magic : return None
+                if reader.read(len(self._key)) != self._key : return None
+                return pickle.load(reader)
+
+        except Exception :
+            #a missing, unreadable or corrupted cache is just rebuilt
+            return None
+
+    def store(self, program : object) -> None:
+        #saves the resolved program, replacing the previous cache atomically
+        temp = "{}.{}.tmp".format(self._path, os.getpid())
+        try :
+            os.makedirs(os.path.dirname(self._path), exist_ok = True)
+            with open(temp, "wb") as writer :
+                writer.write(Cache._magic)
+                writer.write(self._key)
+                pickle.dump(program, writer, protocol = pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self._path)
+
+        except Exception :
+            #caching is only an optimization, so the script still runs if it fails
+            try :
+                os.remove(temp)
+            except OSError :
+                pass
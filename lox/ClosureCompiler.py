@@ -0,0 +1,611 @@
+import sys
+from .TokenType import *
+from .Token import *
+from .PyLoxExceptions import PyLoxRuntimeError
+from .Completion import *
+from .InlineCache import *
+from . import Expr
+from . import Stmt
+from .Environment import *
+from .Callable import *
+from .PyLoxFunction import *
+from .PyLoxFunction import _takeTailCall, _isTailCallable
+from .PyLoxClass import *
+from .PyLoxInstance import *
+
+__all__ = ["ClosureCompiler", "CompiledFunction"]
+
+BREAK, CONTINUE, RETURN = Completion.BREAK, Completion.CONTINUE, Completion.RETURN
+UNDEFINED = GlobalEnvironment.UNDEFINED
+
+"""
+    The ClosureCompiler translates each node of the syntax tree, only once, into a specialized python closure.
+    Each closure receives the current environment and directly calls the closures of its child nodes,
+    so the type of a node is never inspected again while the program is running.
+    Statement closures return their Completion signal, or None.
+"""
+
+class CompiledFunction(PyLoxFunction) :
+    def __init__(self, declaration : Stmt.Function, closure : Environment, isInitializer : bool, body : list,
+                 isMethod : bool = False) :
+        super().__init__(declaration, closure, isInitializer, isMethod)
+        self._body = body #compiled statements of the function body
+
+    def call(self, interpreter, args : list) -> object:
+        #same semantics of PyLoxFunction.call, but running the compiled function body
+        function = self
+        while True :
+            environment = Environment(function.closure, args + function._locals)
+            for stmt in function._body :
+                if stmt(environment) is not None : #only a return statement can leave the function body
+                    break
+            else :
+                if function._isInitializer : return args[0]
+                return None
+
+            if function._isInitializer : return args[0]
+            if interpreter.tailCall is None : return interpreter.returnValue
+
+            #a call in tail position runs in the loop of this call, instead of nesting a new one
+            function, args = _takeTailCall(interpreter)
+            if not isinstance(function, CompiledFunction) : return function.call(interpreter, args)
+
+class ClosureCompiler :
+
+    def __init__(self, interpreter, echoes : set) :
+        self._interpreter = interpreter
+        self._echoes = echoes #expression types echoed in a prompt session
+
+    def compile(self, statement : Stmt) :
+        #returns a closure that executes the statement when called with an environment
+        return self._compileStmt(statement)
+
+    def _compileStmt(self, statement : Stmt) :
+        if isinstance(statement, Stmt.Block) :
+            return self._block(statement)
+
+        elif isinstance(statement, Stmt.Expression) :
+            return self._expressionStmt(statement)
+
+        elif isinstance(statement, Stmt.Function) :
+            return self._function(statement)
+
+        elif isinstance(statement, Stmt.If) :
+            return self._if(statement)
+
+        elif isinstance(statement, Stmt.While) :
+            return self._while(statement)
+
+        elif isinstance(statement, Stmt.For) :
+            return self._for(statement)
+
+        elif isinstance(statement, Stmt.Return) :
+            return self._return(statement)
+
+        elif isinstance(statement, Stmt.Break) :
+            return lambda env : BREAK
+
+        elif isinstance(statement, Stmt.Continue) :
+            return lambda env : CONTINUE
+
+        elif isinstance(statement, Stmt.Print) :
+            return self._print(statement)
+
+        elif isinstance(statement, Stmt.Var) :
+            return self._var(statement)
+
+        elif isinstance(statement, Stmt.Class) :
+            return self._class(statement)
+
+    def _compileExpr(self, expr : Expr) :
+        if isinstance(expr, Expr.Literal) :
+            value = expr.value
+            return lambda env : value
+
+        elif isinstance(expr, Expr.Logical) :
+            return self._logical(expr)
+
+        elif isinstance(expr, Expr.Variable) :
+            return self._variable(expr, expr.name)
+
+        elif isinstance(expr, Expr.Chain) :
+            left = self._compileExpr(expr.left)
+            right = self._compileExpr(expr.right)
+            def chain(env) :
+                left(env)
+                return right(env)
+            return chain
+
+        elif isinstance(expr, Expr.Assign) :
+            return self._assign(expr)
+
+        elif isinstance(expr, Expr.Call) :
+            return self._call(expr)
+
+        elif isinstance(expr, Expr.This) :
+            return self._variable(expr, expr.keyword)
+
+        elif isinstance(expr, Expr.Super) :
+            return self._super(expr)
+
+        elif isinstance(expr, Expr.Get) :
+            return self._get(expr)
+
+        elif isinstance(expr, Expr.Set) :
+            return self._set(expr)
+
+        elif isinstance(expr, Expr.Grouping) :
+            #a grouping has no runtime behaviour of its own
+            return self._compileExpr(expr.expression)
+
+        elif isinstance(expr, Expr.Unary) :
+            return self._unary(expr)
+
+        elif isinstance(expr, Expr.Binary) :
+            return self._binary(expr)
+
+        elif isinstance(expr, Expr.Ternary) :
+            condition = self._compileExpr(expr.condition)
+            thenValue = self._compileExpr(expr.thenValue)
+            elseValue = self._compileExpr(expr.elseValue)
+            def ternary(env) :
+                value = condition(env)
+                if value is None or value is False :
+                    return elseValue(env)
+                return thenValue(env)
+            return ternary
+
+    #statements
+
+    def _block(self, statement : Stmt.Block) :
+        statements = [self._compileStmt(stmt) for stmt in statement.statements]
+        size = statement.size
+        if not size :
+            def flatBlock(env) :
+                #a block without declarations runs in the current scope
+                for stmt in statements :
+                    completion = stmt(env)
+                    if completion is not None : return completion
+            return flatBlock
+
+        def block(env) :
+            inner = Environment(env, [None] * size) #creates and enters into a new nested scope
+            for stmt in statements :
+                completion = stmt(inner)
+                if completion is not None : return completion
+        return block
+
+    def _expressionStmt(self, statement : Stmt.Expression) :
+        expression = self._compileExpr(statement.expression)
+
+        if type(statement.expression) not in self._echoes :
+            def expressionStmt(env) :
+                expression(env) #the value is discarded, so it is not taken for a completion
+            return expressionStmt
+
+        interpreter = self._interpreter
+        def echo(env) :
+            value = expression(env)
+            if interpreter.isPromptSession :
+                print(interpreter._stringify(value)) #echoes to the prompt
+        return echo
+
+    def _function(self, statement : Stmt.Function) :
+        name = statement.name.lexeme
+        body = [self._compileStmt(stmt) for stmt in statement.body.statements]
+        define = self._define(statement)
+        def function(env) :
+            define(env, CompiledFunction(statement, env, False, body))
+        return function
+
+    def _if(self, statement : Stmt.If) :
+        condition = self._compileExpr(statement.condition)
+        thenBranch = self._compileStmt(statement.thenBranch)
+
+        if statement.elseBranch is None :
+            def ifThen(env) :
+                value = condition(env)
+                if value is not None and value is not False :
+                    return thenBranch(env)
+            return ifThen
+
+        elseBranch = self._compileStmt(statement.elseBranch)
+        def ifThenElse(env) :
+            value = condition(env)
+            if value is not None and value is not False :
+                return thenBranch(env)
+            return elseBranch(env)
+        return ifThenElse
+
+    def _while(self, statement : Stmt.While) :
+        condition = self._compileExpr(statement.condition)
+        body = self._compileStmt(statement.body)
+        def whileStmt(env) :
+            while True :
+                value = condition(env)
+                if value is None or value is False : return
+                completion = body(env)
+                if completion is not None :
+                    if completion == BREAK : return
+                    if completion == RETURN : return completion
+        return whileStmt
+
+    def _for(self, statement : Stmt.For) :
+        initializer = None if statement.initializer is None else self._compileStmt(statement.initializer)
+        condition = None if statement.condition is None else self._compileExpr(statement.condition)
+        increment = None if statement.increment is None else self._compileExpr(statement.increment)
+        body = self._compileStmt(statement.body)
+        size = statement.size
+        def forStmt(env) :
+            inner = Environment(env, [None] * size) if size else env #scope of the initializer
+            if initializer is not None : initializer(inner)
+            while True :
+                if condition is not None :
+                    value = condition(inner)
+                    if value is None or value is False : return
+                completion = body(inner)
+                if completion is not None :
+                    if completion == BREAK : return
+                    if completion == RETURN : return completion
+                if increment is not None : increment(inner) #a continue still runs the increment
+        return forStmt
+
+    def _return(self, statement : Stmt.Return) :
+        interpreter = self._interpreter
+        if statement.value is None :
+            def returnNil(env) :
+                interpreter.returnValue = None
+                return RETURN
+            return returnNil
+
+        if statement.isTailCall :
+            call = self._call(statement.value, tail = True)
+            def returnCall(env) :
+                call(env) #the function call makes a returned Lox call, the others set the returned value
+                return RETURN
+            return returnCall
+
+        value = self._compileExpr(statement.value)
+        def returnStmt(env) :
+            interpreter.returnValue = value(env)
+            return RETURN
+        return returnStmt
+
+    def _print(self, statement : Stmt.Print) :
+        expression = self._compileExpr(statement.expression)
+        stringify = self._interpreter._stringify
+        write = sys.stdout.write
+        def printStmt(env) :
+            write(stringify(expression(env)) + "\n")
+        return printStmt
+
+    def _var(self, statement : Stmt.Var) :
+        define = self._define(statement)
+        if statement.initializer is None :
+            return lambda env : define(env, None)
+
+        initializer = self._compileExpr(statement.initializer)
+        def varInit(env) :
+            define(env, initializer(env))
+        return varInit
+
+    def _define(self, declaration : Stmt) :
+        #returns a function that defines the name of a declaration in the environment it receives
+        if declaration.slot is None :
+            name = declaration.name.lexeme
+            define = self._interpreter.globals.define
+            return lambda env, value : define(name, value)
+
+        slot = declaration.slot
+        def defineLocal(env, value) :
+            env._slots[slot] = value
+        return defineLocal
+
+    def _class(self, statement : Stmt.Class) :
+        name = statement.name
+        supercls = None if statement.supercls is None else self._compileExpr(statement.supercls)
+        methods = [(method, method.name.lexeme == "init", [self._compileStmt(stmt) for stmt in method.body.statements])
+                   for method in statement.methods]
+        define = self._define(statement)
+
+        def klass(env) :
+            superclass = None
+            if supercls is not None :
+                superclass = supercls(env)
+                if not isinstance(superclass, PyLoxClass) :
+                    raise PyLoxRuntimeError(statement.supercls.name,
+                                "Superclass of '{}' must be a class.".format(name.lexeme))
+
+            scope = env
+            if superclass is not None :
+                scope = Environment(env, [superclass])
+
+            functions = {}
+            for method, isInitializer, body in methods :
+                functions[method.name.lexeme] = CompiledFunction(method, scope, isInitializer, body, isMethod = True)
+
+            define(env, PyLoxClass(name.lexeme, superclass, functions))
+        return klass
+
+    #expressions
+
+    def _variable(self, expr : Expr, name : Token) :
+        if expr.depth is None :
+            #it is not in some local scope, so it is at a slot of the globals
+            slots = self._interpreter.globals._slots
+            slot = expr.slot
+            getSlot = self._interpreter.globals.getSlot
+            def getGlobal(env) :
+                value = slots[slot]
+                if value is UNDEFINED : return getSlot(slot, name) #raises the error
+                return value
+            return getGlobal
+
+        distance, slot = expr.depth, expr.slot
+        if distance == 0 :
+            return lambda env : env._slots[slot]
+        elif distance == 1 :
+            return lambda env : env.enclosing._slots[slot]
+
+        return lambda env : env.getAt(distance, slot)
+
+    def _assign(self, expr : Expr.Assign) :
+        value = self._compileExpr(expr.value)
+        name = expr.name
+        if expr.depth is None :
+            interpreter = self._interpreter
+            slot = expr.slot
+            def assignGlobal(env) :
+                result = value(env)
+                try :
+                    interpreter.globals.assignSlot(slot, name, result)
+                except PyLoxRuntimeError as error :
+                    #attempt to assign to an undefined variable
+                    interpreter._hadError = True
+                    error.what()
+                return result
+            return assignGlobal
+
+        distance, slot = expr.depth, expr.slot
+        def assignLocal(env) :
+            result = value(env)
+            env.assignAt(distance, slot, result)
+            return result
+        return assignLocal
+
+    def _call(self, expr : Expr.Call, tail : bool = False) :
+        #a call in tail position leaves a Lox function and its arguments to the function call, instead of calling it
+        if type(expr.callee) is Expr.Get :
+            return self._invoke(expr, tail)
+
+        callee = self._compileExpr(expr.callee)
+        args = [self._compileExpr(arg) for arg in expr.args]
+        paren = expr.paren
+        interpreter = self._interpreter
+
+        def call(env) :
+            function = callee(env)
+            arguments = [arg(env) for arg in args]
+
+            if not isinstance(function, Callable) :
+                raise PyLoxRuntimeError(paren, "Can only call functions and classes.")
+
+            if len(arguments) != function.arity() :
+                raise PyLoxRuntimeError(paren, "Expect {} arguments, but got {}.".format(function.arity(), len(arguments)))
+
+            if tail and interpreter.tailCalls and _isTailCallable(function) :
+                interpreter.tailCall = (function, arguments); return
+            try :
+                value = function.call(interpreter, arguments)
+            except RecursionError :
+                raise PyLoxRuntimeError(paren, "Stack overflow.") from None
+            except PyLoxRuntimeError as error :
+                raise error.at(paren)
+
+            if tail : interpreter.returnValue = value #other callables are called at the return statement
+            return value
+        return call
+
+    def _invoke(self, expr : Expr.Call, tail : bool = False) :
+        #calls 'object.name(args)', without binding the method to the instance first
+        obj = self._compileExpr(expr.callee.object)
+        name = expr.callee.name
+        cache = InlineCache(name, "invoke")
+        findMethod = cache.findMethod
+        args = [self._compileExpr(arg) for arg in expr.args]
+        argCount = len(args)
+        paren = expr.paren
+        interpreter = self._interpreter
+
+        def invoke(env) :
+            instance = obj(env)
+            if not isinstance(instance, PyLoxInstance) :
+                raise PyLoxRuntimeError(name, "Only instances have properties.")
+
+            #the method of the first receiver shape is found without a lookup
+            function = cache.entry if instance._shape is cache.shape else findMethod(instance)
+            if function is None :
+                #a field holding a callable, or an undefined property
+                function = instance.get(name)
+                arguments = [arg(env) for arg in args]
+                if not isinstance(function, Callable) :
+                    raise PyLoxRuntimeError(paren, "Can only call functions and classes.")
+            else :
+                arguments = [instance] #the instance is the first argument of a method
+                for arg in args :
+                    arguments.append(arg(env))
+
+            if argCount != function.arity() :
+                raise PyLoxRuntimeError(paren, "Expect {} arguments, but got {}.".format(function.arity(), argCount))
+
+            if tail and interpreter.tailCalls and _isTailCallable(function) :
+                interpreter.tailCall = (function, arguments); return
+            try :
+                value = function.call(interpreter, arguments)
+            except RecursionError :
+                raise PyLoxRuntimeError(paren, "Stack overflow.") from None
+            except PyLoxRuntimeError as error :
+                raise error.at(paren)
+
+            if tail : interpreter.returnValue = value #other callables are called at the return statement
+            return value
+        return invoke
+
+    def _super(self, expr : Expr.Super) :
+        distance, slot = expr.depth, expr.slot
+        method = expr.method
+
+        def superExpr(env) :
+            superclass = env.getAt(distance, slot)
+            thisObject = env.getAt(distance - 1, 0)
+
+            function = superclass.findMethod(method.lexeme)
+            if function is None :
+                raise PyLoxRuntimeError(method, "Undefined property '{}'.".format(method.lexeme))
+
+            return function.bind(thisObject)
+        return superExpr
+
+    def _get(self, expr : Expr.Get) :
+        obj = self._compileExpr(expr.object)
+        name = expr.name
+        cache = InlineCache(name, "get")
+        getProperty = cache.get
+
+        def get(env) :
+            instance = obj(env)
+            if isinstance(instance, PyLoxInstance) :
+                if instance._shape is cache.shape : return instance._values[cache.entry]
+                return getProperty(instance)
+            raise PyLoxRuntimeError(name, "Only instances have properties.")
+        return get
+
+    def _set(self, expr : Expr.Set) :
+        obj = self._compileExpr(expr.object)
+        value = self._compileExpr(expr.value)
+        name = expr.name
+        cache = InlineCache(name, "set")
+        setProperty = cache.set
+
+        def set(env) :
+            instance = obj(env)
+            if not isinstance(instance, PyLoxInstance) :
+                raise PyLoxRuntimeError(name, "Only instances have fields.")
+            result = value(env)
+            if instance._shape is cache.shape :
+                instance._values[cache.entry] = result
+            else :
+                setProperty(instance, result)
+            return result
+        return set
+
+    def _logical(self, expr : Expr.Logical) :
+        left = self._compileExpr(expr.left)
+        right = self._compileExpr(expr.right)
+
+        if expr.operator.tokenValue == TokenType.OR :
+            def logicalOr(env) :
+                value = left(env)
+                if value is not None and value is not False :
+                    return value #true OR anything else is true
+                return right(env)
+            return logicalOr
+
+        def logicalAnd(env) :
+            value = left(env)
+            if value is None or value is False :
+                return value #false AND anything else is false
+            return right(env)
+        return logicalAnd
+
+    def _unary(self, expr : Expr.Unary) :
+        right = self._compileExpr(expr.right)
+        operator = expr.operator
+
+        if operator.tokenValue == TokenType.MINUS :
+            def negate(env) :
+                value = right(env)
+                if not isinstance(value, float) :
+                    raise PyLoxRuntimeError(operator, "All operands must be numbers.")
+                return -value
+            return negate
+
+        def bang(env) :
+            value = right(env)
+            return value is None or value is False
+        return bang
+
+    def _binary(self, expr : Expr.Binary) :
+        left = self._compileExpr(expr.left)
+        right = self._compileExpr(expr.right)
+        operator = expr.operator
+        tokenValue = operator.tokenValue
+        interpreter = self._interpreter
+
+        if tokenValue == TokenType.PLUS :
+            def plus(env) :
+                a = left(env); b = right(env)
+                if isinstance(a, float) and isinstance(b, float) :
+                    return a + b
+                return interpreter._addOrConcatenate(operator, a, b)
+            return plus
+
+        elif tokenValue == TokenType.EQUAL_EQUAL :
+            isEqual = interpreter._isEqual
+            return lambda env : isEqual(left(env), right(env))
+
+        elif tokenValue == TokenType.BANG_EQUAL :
+            isEqual = interpreter._isEqual
+            return lambda env : not isEqual(left(env), right(env))
+
+        elif tokenValue == TokenType.SLASH or tokenValue == TokenType.MOD :
+            isMod = tokenValue == TokenType.MOD
+            def division(env) :
+                a = left(env); b = right(env)
+                if not isinstance(a, float) or not isinstance(b, float) :
+                    raise PyLoxRuntimeError(operator, "All operands must be numbers.")
+                return interpreter._division(operator, a, b, isMod)
+            return division
+
+        #the remaining operators only accept numbers
+        if tokenValue == TokenType.MINUS :
+            def minus(env) :
+                a = left(env); b = right(env)
+                if isinstance(a, float) and isinstance(b, float) : return a - b
+                raise PyLoxRuntimeError(operator, "All operands must be numbers.")
+            return minus
+
+        elif tokenValue == TokenType.STAR :
+            def star(env) :
+                a = left(env); b = right(env)
+                if isinstance(a, float) and isinstance(b, float) : return a * b
+                raise PyLoxRuntimeError(operator, "All operands must be numbers.")
+            return star
+
+        elif tokenValue == TokenType.GREATER :
+            def greater(env) :
+                a = left(env); b = right(env)
+                if isinstance(a, float) and isinstance(b, float) : return a > b
+                raise PyLoxRuntimeError(operator, "All operands must be numbers.")
+            return greater
+
+        elif tokenValue == TokenType.GREATER_EQUAL :
+            def greaterEqual(env) :
+                a = left(env); b = right(env)
+                if isinstance(a, float) and isinstance(b, float) : return a >= b
+                raise PyLoxRuntimeError(operator, "All operands must be numbers.")
+            return greaterEqual
+
+        elif tokenValue == TokenType.LESS :
+            def less(env) :
+                a = left(env); b = right(env)
+                if isinstance(a, float) and isinstance(b, float) : return a < b
+                raise PyLoxRuntimeError(operator, "All operands must be numbers.")
+            return less
+
+        elif tokenValue == TokenType.LESS_EQUAL :
+            def lessEqual(env) :
+                a = left(env); b = right(env)
+                if isinstance(a, float) and isinstance(b, float) : return a <= b
+                raise PyLoxRuntimeError(operator, "All operands must be numbers.")
+            return lessEqual
@@ -0,0 +1,389 @@
+from array import array
+from .TokenType import *
+from .Token import *
+from . import Expr
+from . import Stmt
+from .InlineCache import *
+
+__all__ = ["Compiler", "Chunk", "OpCode", "FunctionProto", "ClassProto"]
+
+"""
+    The Compiler translates the resolved syntax tree into bytecode for the VM.
+    Each chunk of bytecode keeps its instructions in an array of 32 bits words, where each instruction and each operand
+    takes a word, so jumps and constant indexes are not limited by the size of the sources,
+    and the values they refer to are kept in a constants pool.
+    Each top-level statement and each function body is compiled into its own chunk.
+    Property reads, writes and method calls refer to an InlineCache constant of their own.
+"""
+
+class OpCode :
+    #ADD to LESS_EQUAL are the binary operators, in this order
+    GET_LOCAL, SET_LOCAL, DEFINE_LOCAL, GET_GLOBAL, SET_GLOBAL, DEFINE_GLOBAL, \
+    CONSTANT, NIL, TRUE, FALSE, POP, \
+    ADD, SUBTRACT, MULTIPLY, DIVIDE, MODULO, \
+    EQUAL, NOT_EQUAL, GREATER, GREATER_EQUAL, LESS, LESS_EQUAL, \
+    NEGATE, NOT, \
+    JUMP, JUMP_IF_FALSE, AND, OR, LOOP, \
+    CALL, INVOKE, TAIL_CALL, TAIL_INVOKE, RETURN, FUNCTION, CLASS, \
+    GET_PROPERTY, GET_METHOD, CHECK_FIELDS, SET_PROPERTY, GET_SUPER, \
+    PUSH_SCOPE, POP_SCOPE, PRINT, ECHO = range(45)
+
+#number of operands of each instruction, all other instructions have no operands
+_operands = {
+    OpCode.GET_LOCAL : 2, OpCode.SET_LOCAL : 2, OpCode.DEFINE_LOCAL : 1,
+    OpCode.GET_GLOBAL : 1, OpCode.SET_GLOBAL : 1, OpCode.DEFINE_GLOBAL : 1, OpCode.CONSTANT : 1,
+    OpCode.JUMP : 1, OpCode.JUMP_IF_FALSE : 1, OpCode.AND : 1, OpCode.OR : 1, OpCode.LOOP : 1,
+    OpCode.CALL : 1, OpCode.INVOKE : 1, OpCode.TAIL_CALL : 1, OpCode.TAIL_INVOKE : 1, OpCode.FUNCTION : 1, OpCode.CLASS : 1,
+    OpCode.GET_PROPERTY : 1, OpCode.GET_METHOD : 1, OpCode.CHECK_FIELDS : 1, OpCode.SET_PROPERTY : 1, OpCode.GET_SUPER : 3,
+    OpCode.PUSH_SCOPE : 1
+}
+
+_opNames = {value : name for name, value in vars(OpCode).items() if not name.startswith("_")}
+
+class Chunk :
+    __slots__ = ("code", "constants", "tokens")
+
+    def __init__(self) :
+        self.code = array("I")  #instructions and their operands, a word each
+        self.constants = []     #values referred to by the instructions
+        self.tokens = {}        #token of each instruction that may raise a runtime error, by offset
+
+    def disassemble(self) -> str:
+        #returns a readable listing of the instructions of this chunk
+        lines = []
+        offset = 0
+        while offset < len(self.code) :
+            op = self.code[offset]
+            operands = self.code[offset + 1 : offset + 1 + _operands.get(op, 0)]
+            lines.append("{:05d} {:<14} {}".format(offset, _opNames[op], " ".join(str(operand) for operand in operands)))
+            offset += 1 + len(operands)
+        return "\n".join(lines)
+
+class FunctionProto :
+    __slots__ = ("declaration", "chunk", "isInitializer")
+
+    #a compiled function, from which the VM creates a function object for each closure
+    def __init__(self, declaration : Stmt.Function, chunk : Chunk, isInitializer : bool) :
+        self.declaration = declaration
+        self.chunk = chunk
+        self.isInitializer = isInitializer
+
+class ClassProto :
+    __slots__ = ("declaration", "methods")
+
+    #a compiled class declaration, with one FunctionProto for each method
+    def __init__(self, declaration : Stmt.Class, methods : list) :
+        self.declaration = declaration
+        self.methods = methods
+
+class _Loop :
+    __slots__ = ("start", "scopeDepth", "breaks", "continues")
+
+    def __init__(self, start : int, scopeDepth : int) :
+        self.start = start            #offset where the condition is evaluated
+        self.scopeDepth = scopeDepth  #scopes opened when the loop starts
+        self.breaks = []              #jumps to be patched to the loop exit
+        self.continues = []           #jumps to be patched to the end of the body, before the increment of a for loop
+
+class Compiler :
+
+    def __init__(self, echoes : set) :
+        self._echoes = echoes #expression types echoed in a prompt session
+        self._chunk = None
+        self._constants = None
+        self._scopeDepth = 0
+        self._loops = []
+
+    def compile(self, statement : Stmt) -> Chunk:
+        #compiles a top-level statement into its own chunk
+        return self._compileChunk([statement])
+
+    def _compileChunk(self, statements : list) -> Chunk:
+        enclosing = (self._chunk, self._constants, self._scopeDepth, self._loops)
+        self._chunk = Chunk()
+        self._constants = {}
+        self._scopeDepth = 0
+        self._loops = []
+
+        for statement in statements :
+            self._compileStmt(statement)
+        self._emit(OpCode.NIL)
+        self._emit(OpCode.RETURN)
+
+        chunk = self._chunk
+        self._chunk, self._constants, self._scopeDepth, self._loops = enclosing
+        return chunk
+
+    def _emit(self, op : int, *operands : int, token : Token = None) -> None:
+        if token is not None :
+            self._chunk.tokens[len(self._chunk.code)] = token
+
+        self._chunk.code.append(op)
+        self._chunk.code.extend(operands)
+
+    def _makeConstant(self, value : object) -> int:
+        #numbers and strings are stored only once, every other constant has its own entry
+        key = (type(value), value) if isinstance(value, (float, str)) else (type(value), id(value))
+        if key not in self._constants :
+            self._constants[key] = len(self._chunk.constants)
+            self._chunk.constants.append(value)
+        return self._constants[key]
+
+    def _emitJump(self, op : int, token : Token = None) -> int:
+        #emits a forward jump, whose operand is patched later
+        self._emit(op, 0, token = token)
+        return len(self._chunk.code) - 1
+
+    def _patchJump(self, offset : int) -> None:
+        #the jump goes to the current end of the chunk, relative to the end of the jump instruction
+        self._chunk.code[offset] = len(self._chunk.code) - offset - 1
+
+    def _emitLoop(self, start : int) -> None:
+        #jumps backwards to start, relative to the end of the loop instruction
+        self._emit(OpCode.LOOP, len(self._chunk.code) + 2 - start)
+
+    def _pushScope(self, size : int) -> None:
+        #a scope without declarations has no environment
+        if size :
+            self._emit(OpCode.PUSH_SCOPE, size)
+            self._scopeDepth += 1
+
+    def _popScope(self, size : int) -> None:
+        if size :
+            self._scopeDepth -= 1
+            self._emit(OpCode.POP_SCOPE)
+
+    def _popScopes(self, depth : int) -> None:
+        #leaves the scopes opened after depth, used by break and continue
+        for i in range(self._scopeDepth - depth) :
+            self._emit(OpCode.POP_SCOPE)
+
+    def _compileStmt(self, statement : Stmt) -> None:
+        if isinstance(statement, Stmt.Expression) :
+            self._compileExpr(statement.expression)
+            self._emit(OpCode.ECHO if type(statement.expression) in self._echoes else OpCode.POP)
+
+        elif isinstance(statement, Stmt.Print) :
+            self._compileExpr(statement.expression)
+            self._emit(OpCode.PRINT)
+
+        elif isinstance(statement, Stmt.Var) :
+            if statement.initializer is None : self._emit(OpCode.NIL)
+            else : self._compileExpr(statement.initializer)
+            self._define(statement)
+
+        elif isinstance(statement, Stmt.Block) :
+            self._pushScope(statement.size)
+            for stmt in statement.statements :
+                self._compileStmt(stmt)
+            self._popScope(statement.size)
+
+        elif isinstance(statement, Stmt.If) :
+            self._compileExpr(statement.condition)
+            elseJump = self._emitJump(OpCode.JUMP_IF_FALSE)
+            self._compileStmt(statement.thenBranch)
+
+            if statement.elseBranch is None :
+                self._patchJump(elseJump)
+            else :
+                endJump = self._emitJump(OpCode.JUMP)
+                self._patchJump(elseJump)
+                self._compileStmt(statement.elseBranch)
+                self._patchJump(endJump)
+
+        elif isinstance(statement, Stmt.While) :
+            loop = _Loop(len(self._chunk.code), self._scopeDepth)
+            self._compileExpr(statement.condition)
+            exitJump = self._emitJump(OpCode.JUMP_IF_FALSE)
+
+            self._compileLoopBody(loop, statement.body)
+
+            self._emitLoop(loop.start)
+            self._patchJump(exitJump)
+            for breakJump in loop.breaks :
+                self._patchJump(breakJump)
+
+        elif isinstance(statement, Stmt.For) :
+            #the initializer has its own scope around the loop
+            self._pushScope(statement.size)
+            if statement.initializer is not None :
+                self._compileStmt(statement.initializer)
+
+            loop = _Loop(len(self._chunk.code), self._scopeDepth)
+            exitJump = None
+            if statement.condition is not None :
+                self._compileExpr(statement.condition)
+                exitJump = self._emitJump(OpCode.JUMP_IF_FALSE)
+
+            self._compileLoopBody(loop, statement.body)
+            if statement.increment is not None :
+                self._compileExpr(statement.increment)
+                self._emit(OpCode.POP)
+
+            self._emitLoop(loop.start)
+            if exitJump is not None :
+                self._patchJump(exitJump)
+            for breakJump in loop.breaks :
+                self._patchJump(breakJump)
+            self._popScope(statement.size)
+
+        elif isinstance(statement, Stmt.Break) :
+            loop = self._loops[-1]
+            self._popScopes(loop.scopeDepth)
+            loop.breaks.append(self._emitJump(OpCode.JUMP))
+
+        elif isinstance(statement, Stmt.Continue) :
+            loop = self._loops[-1]
+            self._popScopes(loop.scopeDepth)
+            loop.continues.append(self._emitJump(OpCode.JUMP))
+
+        elif isinstance(statement, Stmt.Function) :
+            proto = self._function(statement, False)
+            self._emit(OpCode.FUNCTION, self._makeConstant(proto))
+            self._define(statement)
+
+        elif isinstance(statement, Stmt.Return) :
+            if statement.isTailCall :
+                #a Lox function takes the frame of this chunk, the RETURN only runs after the other callables
+                self._call(statement.value, OpCode.TAIL_CALL, OpCode.TAIL_INVOKE)
+                self._emit(OpCode.RETURN); return
+
+            if statement.value is None : self._emit(OpCode.NIL)
+            else : self._compileExpr(statement.value)
+            self._emit(OpCode.RETURN)
+
+        elif isinstance(statement, Stmt.Class) :
+            if statement.supercls is not None :
+                self._compileExpr(statement.supercls)
+
+            methods = [self._function(method, method.name.lexeme == "init") for method in statement.methods]
+            self._emit(OpCode.CLASS, self._makeConstant(ClassProto(statement, methods)))
+            self._define(statement)
+
+    def _compileLoopBody(self, loop : _Loop, body : Stmt) -> None:
+        #compiles the body of a loop, whose continue statements jump to its end
+        self._loops.append(loop)
+        self._compileStmt(body)
+        self._loops.pop()
+
+        for continueJump in loop.continues :
+            self._patchJump(continueJump)
+
+    def _define(self, declaration : Stmt) -> None:
+        #defines the name of a declaration with the value on top of the stack
+        if declaration.slot is None :
+            self._emit(OpCode.DEFINE_GLOBAL, self._makeConstant(declaration.name.lexeme))
+        else :
+            self._emit(OpCode.DEFINE_LOCAL, declaration.slot)
+
+    def _function(self, declaration : Stmt.Function, isInitializer : bool) -> FunctionProto:
+        return FunctionProto(declaration, self._compileChunk(declaration.body.statements), isInitializer)
+
+    def _compileExpr(self, expr : Expr) -> None:
+        if isinstance(expr, Expr.Literal) :
+            if expr.value is None : self._emit(OpCode.NIL)
+            elif expr.value is True : self._emit(OpCode.TRUE)
+            elif expr.value is False : self._emit(OpCode.FALSE)
+            else : self._emit(OpCode.CONSTANT, self._makeConstant(expr.value))
+
+        elif isinstance(expr, Expr.Variable) :
+            self._variable(expr, expr.name)
+
+        elif isinstance(expr, Expr.Binary) :
+            self._compileExpr(expr.left)
+            self._compileExpr(expr.right)
+            self._emit(_binaryOperations[expr.operator.tokenValue], token = expr.operator)
+
+        elif isinstance(expr, Expr.Call) :
+            self._call(expr, OpCode.CALL, OpCode.INVOKE)
+
+        elif isinstance(expr, Expr.Assign) :
+            self._compileExpr(expr.value)
+            if expr.depth is None :
+                self._emit(OpCode.SET_GLOBAL, expr.slot, token = expr.name)
+            else :
+                self._emit(OpCode.SET_LOCAL, expr.depth, expr.slot)
+
+        elif isinstance(expr, Expr.Get) :
+            self._compileExpr(expr.object)
+            self._emit(OpCode.GET_PROPERTY, self._makeConstant(InlineCache(expr.name, "get")), token = expr.name)
+
+        elif isinstance(expr, Expr.Set) :
+            #the object is checked before the value is evaluated
+            self._compileExpr(expr.object)
+            self._emit(OpCode.CHECK_FIELDS, self._makeConstant(expr.name), token = expr.name)
+            self._compileExpr(expr.value)
+            self._emit(OpCode.SET_PROPERTY, self._makeConstant(InlineCache(expr.name, "set")))
+
+        elif isinstance(expr, Expr.This) :
+            self._variable(expr, expr.keyword)
+
+        elif isinstance(expr, Expr.Super) :
+            self._emit(OpCode.GET_SUPER, expr.depth, expr.slot, self._makeConstant(expr.method), token = expr.method)
+
+        elif isinstance(expr, Expr.Grouping) :
+            self._compileExpr(expr.expression)
+
+        elif isinstance(expr, Expr.Unary) :
+            self._compileExpr(expr.right)
+            if expr.operator.tokenValue == TokenType.MINUS :
+                self._emit(OpCode.NEGATE, token = expr.operator)
+            else :
+                self._emit(OpCode.NOT)
+
+        elif isinstance(expr, Expr.Logical) :
+            #the left operand stays on the stack if it decides the result
+            self._compileExpr(expr.left)
+            endJump = self._emitJump(OpCode.OR if expr.operator.tokenValue == TokenType.OR else OpCode.AND)
+            self._compileExpr(expr.right)
+            self._patchJump(endJump)
+
+        elif isinstance(expr, Expr.Ternary) :
+            self._compileExpr(expr.condition)
+            elseJump = self._emitJump(OpCode.JUMP_IF_FALSE)
+            self._compileExpr(expr.thenValue)
+            endJump = self._emitJump(OpCode.JUMP)
+            self._patchJump(elseJump)
+            self._compileExpr(expr.elseValue)
+            self._patchJump(endJump)
+
+        elif isinstance(expr, Expr.Chain) :
+            self._compileExpr(expr.left)
+            self._emit(OpCode.POP)
+            self._compileExpr(expr.right)
+
+    def _call(self, expr : Expr.Call, call : int, invoke : int) -> None:
+        if type(expr.callee) is Expr.Get :
+            #a method call : GET_METHOD leaves the method and the instance, its first argument, on the stack
+            self._compileExpr(expr.callee.object)
+            self._emit(OpCode.GET_METHOD, self._makeConstant(InlineCache(expr.callee.name, "invoke")), token = expr.callee.name)
+            for arg in expr.args :
+                self._compileExpr(arg)
+            self._emit(invoke, len(expr.args), token = expr.paren)
+            return
+
+        self._compileExpr(expr.callee)
+        for arg in expr.args :
+            self._compileExpr(arg)
+        self._emit(call, len(expr.args), token = expr.paren)
+
+    def _variable(self, expr : Expr, name : Token) -> None:
+        if expr.depth is None :
+            #the slot of the global was given by the Resolver, the name token reports it if it is undefined
+            self._emit(OpCode.GET_GLOBAL, expr.slot, token = name)
+        else :
+            self._emit(OpCode.GET_LOCAL, expr.depth, expr.slot)
+
+_binaryOperations = {
+    TokenType.PLUS          : OpCode.ADD,
+    TokenType.MINUS         : OpCode.SUBTRACT,
+    TokenType.STAR          : OpCode.MULTIPLY,
+    TokenType.SLASH         : OpCode.DIVIDE,
+    TokenType.MOD           : OpCode.MODULO,
+    TokenType.EQUAL_EQUAL   : OpCode.EQUAL,
+    TokenType.BANG_EQUAL    : OpCode.NOT_EQUAL,
+    TokenType.GREATER       : OpCode.GREATER,
+    TokenType.GREATER_EQUAL : OpCode.GREATER_EQUAL,
+    TokenType.LESS          : OpCode.LESS,
+    TokenType.LESS_EQUAL    : OpCode.LESS_EQUAL
+}
@@ -0,0 +1,10 @@
+__all__ = ["Completion"]
+
+"""
+    Statements that transfer the control - break, continue and return - complete with a signal,
+    which is returned up to the loop or function that handles it, instead of raising an exception.
+    Any other statement completes normally, with None.
+"""
+
+class Completion :
+    BREAK, CONTINUE, RETURN = range(1, 4)
@@ -1,36 +1,25 @@
 from .Token import *
 from .PyLoxExceptions import PyLoxRuntimeError
 
-__all__ = ["Environment"]
+__all__ = ["Environment", "GlobalEnvironment"]
 
 class Environment :
-    __slots__ = ["_values", "enclosing"]
+    __slots__ = ["_slots", "enclosing"]
     
-    #the 'enclosing' field is an enclosing environment,
-    #that is None (not defined) if it is the global scope
-    def __init__(self, enclosing = None) :
-        self._values = {}
+    #a local scope, where each variable is stored at the slot index given by the Resolver
+    #the 'enclosing' field is an enclosing environment
+    #'slots' has one entry for each variable of the scope, the ones not defined yet are None
+    def __init__(self, enclosing, slots : list) :
+        self._slots = slots
         self.enclosing = enclosing
     
-    def define(self, name : str, value : object) -> None:
-        #binds a new name to a value
-        self._values[name] = value
+    def define(self, slot : int, value : object) -> None:
+        #binds a new variable, declared at slot, to a value
+        self._slots[slot] = value
     
-    def get(self, name : Token) -> object:
-        #looks up the value of the variable 'name'
-        #searches for the definition of the variable in the local scope
-        if name.lexeme in self._values :
-            return self._values[name.lexeme]
-        
-        #searches for the definition of the variable in the outer blocks 
-        if self.enclosing != None : 
-            return self.enclosing.get(name)
-            
-        raise PyLoxRuntimeError(name, "Undefined name '{}'.".format(name.lexeme))
-    
-    def getAt(self, distance : int, name : str) :
+    def getAt(self, distance : int, slot : int) :
         environment = self._ancestor(distance)
-        return environment._values[name]
+        return environment._slots[slot]
     
     def _ancestor(self, dist : int) :
         #get an external scope at a distance 'dist' from the current scope
@@ -39,26 +28,64 @@ class Environment :
             environment = environment.enclosing
             
         return environment
+   
+    def assignAt(self, distance : int, slot : int, value : object) -> None:
+        environment = self._ancestor(distance)
+        environment._slots[slot] = value; return
+
+class GlobalEnvironment :
+    __slots__ = ["_slots", "_names", "_index"]
     
-    def assign(self, name : Token, value : object) -> None:
-        #assigns to a variable if it is visible in the current scope
-        
-        #tries to find this variable in the local scope
-        if name.lexeme in self._values :
-            self._values[name.lexeme] = value; return
-        
-        #tries to find this variable in an outer scope
-        try : 
-            if self.enclosing != None : 
-                self.enclosing.assign(name, value); return
+    UNDEFINED = object() #value of the slots of names that are not defined yet
+    
+    #the global scope, where each name gets a slot when it is first resolved or defined
+    #names used before their definition, by a forward reference or in a later prompt line, 
+    #keep the same slot, so they are bound when they are defined
+    def __init__(self) :
+        self._slots = []
+        self._names = [] #name of each slot
+        self._index = {} #slot of each name
+    
+    def slot(self, name : str) -> int:
+        #returns the slot of a global name, reserving a new one for an unknown name
+        slot = self._index.get(name)
+        if slot is None :
+            slot = self._index[name] = len(self._slots)
+            self._slots.append(GlobalEnvironment.UNDEFINED)
+            self._names.append(name)
+        return slot
+    
+    def names(self) -> list:
+        #returns the name of each slot
+        return list(self._names)
+    
+    def restore(self, names : list) -> bool:
+        #reserves the slots given to names when they were resolved in another session,
+        #returns False, without reserving any slot, if they cannot have the same slots here
+        count = len(self._names)
+        if names[:count] != self._names[:len(names)] : return False
         
-        except PyLoxExceptions : 
-            raise
+        #the names not known yet get the next slots, in order
+        if any(name in self._index for name in names[count:]) : return False
+        for name in names[count:] :
+            self.slot(name)
+        return True
+    
+    def define(self, name : str, value : object) -> None:
+        #binds a new name to a value, unlike local scopes it is defined by name
+        self._slots[self.slot(name)] = value
+    
+    def getSlot(self, slot : int, name : Token) -> object:
+        #looks up the value of the variable 'name', resolved to slot
+        value = self._slots[slot]
+        if value is GlobalEnvironment.UNDEFINED :
+            raise PyLoxRuntimeError(name, "Undefined name '{}'.".format(name.lexeme))
+        return value
+    
+    def assignSlot(self, slot : int, name : Token, value : object) -> None:
+        #assigns to a variable resolved to slot, if it is already defined
+        if self._slots[slot] is GlobalEnvironment.UNDEFINED :
+            #undeclared variable, cannot create a new variable here
+            raise PyLoxRuntimeError(name, "Undefined variable '{}'.".format(name.lexeme))
         
-        #undeclared variable, cannot create a new variable here
-        raise PyLoxRuntimeError(name, "Undefined variable '{}'.".format(name.lexeme))
-   
-    def assignAt(self, distance : int, name : Token, value : object) -> None:
-        environment = self._ancestor(distance)
-        environment._values[name.lexeme] = value; return
-         
+        self._slots[slot] = value
@@ -1,8 +1,11 @@
 from .Token import *
 
-class Expr(object) : pass
+class Expr(object) :
+    __slots__ = ()
 
 class Grouping (Expr) :
+    __slots__ = ("expression",)
+    
     #grouping -> "(" expression ")"
     def __init__(self, expression : Expr) :
         self.expression = expression    
@@ -11,6 +14,8 @@ class Grouping (Expr) :
         return "(" + str(self.expression) + ")"
     
 class Literal  (Expr) :
+    __slots__ = ("value",)
+    
     #literal -> NUMBER | STRING | nil | true | false
     def __init__(self, value : object) : 
         self.value = value
@@ -19,6 +24,8 @@ class Literal  (Expr) :
         return str(self.value)
     
 class Logical  (Expr) :
+    __slots__ = ("left", "operator", "right")
+    
     #logical -> left <operator> right
     #operator = {and, or}
     def __init__(self, left : Expr, operator : Token, right : Expr) :
@@ -30,6 +37,8 @@ class Logical  (Expr) :
         return str(self.left) + " " + self.operator.lexeme + " " + str(self.right)
       
 class Unary (Expr) :
+    __slots__ = ("operator", "right")
+    
     #unary -> <operator> right
     #operator = {!, -}
     def __init__(self, operator : Token, right : Expr) :
@@ -40,6 +49,8 @@ class Unary (Expr) :
         return self.operator.lexeme + str(self.right)
 
 class Binary   (Expr) :
+    __slots__ = ("left", "operator", "right")
+    
     #binary -> left <operator> right
     #operator = {<, <=, >, >=, ==, !=, /, *, +, -}
     def __init__(self, left : Expr, operator : Token, right : Expr) :
@@ -51,6 +62,8 @@ class Binary   (Expr) :
         return str(self.left) + " " + self.operator.lexeme + " " + str(self.right)
 
 class Ternary (Expr) :
+    __slots__ = ("condition", "operator", "thenValue", "elseValue")
+    
     #ternary -> condition "?" thenBranch ":" elseBranch
     def __init__(self, condition : Expr, operator : Token, thenValue : Expr, elseValue : Expr) :
         self.condition = condition
@@ -62,15 +75,21 @@ class Ternary (Expr) :
         return str(self.condition) + " ? " + str(self.thenValue) + " : " + str(self.elseValue)
 
 class Variable (Expr) :
+    __slots__ = ("name", "depth", "slot")
+    
     #variable -> var <name>; #var declaration
     #variable -> <name> referred in some expression
     def __init__(self, name : Token) :
         self.name = name
+        self.depth = None #scope distance given by the Resolver, None for a global variable
+        self.slot = None  #slot of the variable in the environment at that distance
     
     def __str__(self) :
         return self.name.lexeme
 
 class Chain (Expr) :
+    __slots__ = ("left", "operator", "right")
+    
     #chain -> left "," right
     def __init__(self, left : Expr, operator : Token, right : Expr) :
         self.left = left
@@ -81,57 +100,77 @@ class Chain (Expr) :
         return str(self.left) + "," + str(self.right)
 
 class Assign   (Expr) :
+    __slots__ = ("name", "value", "depth", "slot")
+    
     #assign -> var <name> = value
     def __init__(self, name : Token, value : Expr) :
         self.name = name
         self.value = value
+        self.depth = None #scope distance given by the Resolver, None for a global variable
+        self.slot = None  #slot of the variable in the environment at that distance
     
     def __str__(self) :
         return self.name.lexeme + " = " + str(self.value)    
     
 class Call  (Expr) :
+    __slots__ = ("callee", "paren", "args")
+    
     #call -> callee(args)
     def __init__(self, callee : Expr, paren : Token, args : list) :
         self.callee = callee
         self.paren = paren
-        self.args = args
+        self.args = tuple(args) #a tuple has no spare capacity, unlike the parsed list
     
     def __str__(self) :
         args = ", ".join(str(arg) for arg in self.args)
         return str(self.callee) + "(" + args + ")"
 
 class This (Expr) :
+    __slots__ = ("keyword", "depth", "slot")
+    
     #this -> this ("." (IDENTIFIER | Call))*
     def __init__(self, keyword : Token) :
          self.keyword = keyword
+         self.depth = None #scope distance given by the Resolver
+         self.slot = None
     
     def __str__(self) :
         return "this"
 
 class Super (Expr) :
+    __slots__ = ("keyword", "method", "depth", "slot")
+    
     #super -> super "." IDENTIFIER
     def __init__(self, keyword : Token, method : Token) :
         self.keyword = keyword
         self.method = method
+        self.depth = None #scope distance given by the Resolver
+        self.slot = None
     
     def __str__(self) :
         return "super." + self.method.lexeme;
 
 class Get (Expr) :
+    __slots__ = ("object", "name", "cache")
+    
     #get -> object.name
     def __init__(self, obj : Expr, name : Token) :
         self.object = obj
         self.name = name
+        self.cache = None #inline cache of the tree-walk interpreter, created when it is first evaluated
        
     def __str__(self) :
         return str(self.object) + "." + self.name.lexeme
 
 class Set (Expr) :
+    __slots__ = ("object", "name", "value", "cache")
+    
     #set -> object.name = value
     def __init__(self, obj : Expr, name : Token, value : Expr) :
         self.object = obj
         self.name = name
         self.value = value
+        self.cache = None #inline cache of the tree-walk interpreter, created when it is first evaluated
         
     def __str__(self) :
         return str(self.object) + "." + self.name.lexeme + " = " + str(self.value)
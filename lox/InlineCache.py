@@ -0,0 +1,125 @@
+import sys
+from .Token import *
+from .PyLoxExceptions import PyLoxRuntimeError
+
+__all__ = ["InlineCache"]
+
+"""
+    An InlineCache belongs to a single property access site of the program, such as 'this.x', 'this.x = 1' or 'obj.method()'.
+    It remembers the result of the lookup for the shapes of the receivers seen at that site :
+    the slot of a field, the method of the class, or the next shape of an instance when a field is added.
+    It is monomorphic after the first shape, polymorphic up to InlineCache.SIZE shapes,
+    and megamorphic beyond, where new shapes take the generic lookup at every access.
+    The result for the first shape is also kept in the shape and entry attributes, unless it is a write adding a field,
+    which the access sites check before any lookup : 'if instance._shape is cache.shape'.
+    Each cache counts its hits and misses, which are reported with the --ic-stats option :
+    while they are counted, the first shape is not kept, so every access takes the counted lookup.
+"""
+
+class InlineCache :
+    __slots__ = ("name", "_lexeme", "kind", "_entries", "hits", "misses", "shape", "entry")
+
+    SIZE = 4      #shapes remembered by a polymorphic site
+    stats = False #the caches are only registered for the statistics, when they are reported
+    sites = []    #every cache created while stats is set
+
+    def __init__(self, name : Token, kind : str) :
+        self.name = name      #name of the property
+        self._lexeme = name.lexeme
+        self.kind = kind      #kind of access site, "get", "set" or "invoke"
+        self._entries = {}    #result of the lookup of 'name' for each receiver shape
+        self.hits = 0
+        self.misses = 0
+        self.shape = None     #first receiver shape, whose field slot or method is the entry
+        self.entry = None
+        if InlineCache.stats : InlineCache.sites.append(self)
+
+    def get(self, instance) -> object:
+        #same result of instance.get(name)
+        if instance._shape is self.shape : return instance._values[self.entry]
+
+        entry = self._lookup(instance._shape, instance._klass)
+        if type(entry) is int :
+            return instance._values[entry]
+
+        if entry is not None :
+            return entry.bind(instance)
+
+        raise PyLoxRuntimeError(self.name, "Undefined property '{}'.".format(self.name.lexeme))
+
+    def findMethod(self, instance) :
+        #same result of instance.findMethod(name)
+        if instance._shape is self.shape : return self.entry
+
+        entry = self._lookup(instance._shape, instance._klass)
+        if type(entry) is int : return None
+
+        return entry
+
+    def set(self, instance, value : object) -> None:
+        #same effect of instance.set(name, value)
+        shape = instance._shape
+        if shape is self.shape :
+            instance._values[self.entry] = value; return
+
+        entries = self._entries
+        if shape in entries :
+            self.hits += 1
+            slot, nextShape = entries[shape]
+        else :
+            self.misses += 1
+            slot = shape.slots.get(self._lexeme)
+            nextShape = None
+            if slot is None :
+                #a new field moves the instances of this shape to the next one
+                nextShape = shape.transition(self._lexeme)
+                slot = nextShape.slots[self._lexeme]
+            if not entries and not InlineCache.stats and nextShape is None :
+                #only the writes of an existing field are kept, the fields added move the instances to a new shape
+                self.shape, self.entry = shape, slot
+            if len(entries) < InlineCache.SIZE :
+                entries[shape] = (slot, nextShape)
+
+        if nextShape is None :
+            instance._values[slot] = value; return
+
+        instance._shape = nextShape
+        instance._values.append(value)
+
+    def _lookup(self, shape, klass) :
+        #returns the slot of the field called 'name' for the shape, else the method of its class, or None
+        entries = self._entries
+        if shape in entries :
+            self.hits += 1
+            return entries[shape]
+
+        self.misses += 1
+        entry = shape.slots.get(self._lexeme)
+        if entry is None :
+            entry = klass.findMethod(self._lexeme)
+        if not entries and not InlineCache.stats and entry is not None and (type(entry) is int) == (self.kind == "get") :
+            #a "get" site keeps the slot of a field, an "invoke" site keeps a method
+            self.shape, self.entry = shape, entry
+        if len(entries) < InlineCache.SIZE :
+            entries[shape] = entry
+        return entry
+
+    def state(self) -> str:
+        if not self._entries : return "uninitialized"
+        if len(self._entries) == 1 : return "monomorphic"
+        if self.misses > len(self._entries) and len(self._entries) == InlineCache.SIZE : return "megamorphic"
+        return "polymorphic"
+
+    @staticmethod
+    def report(file = sys.stderr) -> None:
+        #prints the statistics of the sites that were executed, the busiest first
+        sites = sorted((site for site in InlineCache.sites if site.hits + site.misses),
+                       key = lambda site : site.hits + site.misses, reverse = True)
+
+        print("{:>6} {:<20} {:<7} {:<14} {:>10} {:>10} {:>7}".format("line", "property", "site", "state",
+                                                                     "hits", "misses", "hit %"), file = file)
+        for site in sites :
+            print("{:>6} {:<20} {:<7} {:<14} {:>10} {:>10} {:>7}".format(site.name.line, site.name.lexeme, site.kind,
+                                                                         site.state(), site.hits, site.misses,
+                                                                         "{:.1f}%".format(100.0 * site.hits / (site.hits + site.misses))), 
+                  file = file)
@@ -3,16 +3,20 @@ import time
 from .TokenType import *
 from .Token import *
 from .PyLoxExceptions import PyLoxRuntimeError
-from .PyLoxExceptions import ReturnException
-from .PyLoxExceptions import LoopControlException
-from .PyLoxExceptions import BreakException, ContinueException
+from .Completion import *
+from .InlineCache import *
+from .Rope import *
+from .Stringify import *
 from . import Expr
 from . import Stmt
 from .Environment import *
 from .Callable import *
 from .PyLoxFunction import *
+from .PyLoxFunction import _isTailCallable
 from .PyLoxClass import *
 from .PyLoxInstance import *
+from .PyLoxList import *
+from .ClosureCompiler import *
 
 __all__ = ["Interpreter"]
 
@@ -30,14 +34,19 @@ _toEcho = {
 }
 
 class Interpreter :
+    tailCalls = True #Lox calls in tail position run in the loop of the calling function, instead of nesting
 
-    def __init__(self, isPromptSession : bool = False) :
+    def __init__(self, isPromptSession : bool = False, compiled : bool = False) :
         self.isPromptSession = isPromptSession
         
+        #in compiled mode, each statement is translated into a closure tree before being executed
+        self._compiler = ClosureCompiler(self, _toEcho) if compiled else None
+        
         self._hadError = False
-        self.globals = Environment() #global scope
+        self.globals = GlobalEnvironment() #global scope
         self._environment = self.globals #the current scope is the global scope
-        self._locals = {} #define all variables referenced at local scopes
+        self.returnValue = None #value of the last return statement, taken by the function call
+        self.tailCall = None #function and arguments of the last call in tail position, made by the function call
         
         # native/built-in functions definition
         
@@ -47,28 +56,45 @@ class Interpreter :
                 """The built-in python function clock returns the CPU time or real time 
                    since the start of the process or since the first call to clock().
                 """
-                return time.clock()
+                return time.perf_counter()
             def __str__(self) :
                 return "<native function clock>"
                 
         self.globals.define("clock", Clock())
+        self.globals.define("List", PyLoxListClass())
         
-    def Interpret(self, statements : list) -> None:
+    def Interpret(self, statements : list) -> bool:
         #interpret each Statement Syntax in a list of statements
+        #returns False if the execution was interrupted by a runtime error
         
         try :
-            for statement in statements :
-                self._execute(statement)
+            if self._compiler is not None :
+                code = [self._compiler.compile(statement) for statement in statements]
+                for stmt in code :
+                    stmt(self._environment)
+            else :
+                for statement in statements :
+                    self._execute(statement)
             
         except PyLoxRuntimeError as error :
             self._hadError = True
             error.what()
+            return False
+        
+        return True
     
-    def _execute(self, statement : Stmt) -> None:
-        #executes a statement
+    def _execute(self, statement : Stmt) -> int:
+        #executes a statement, and returns its Completion signal or None
         if isinstance(statement, Stmt.Block) :
+            if not statement.size :
+                #a block without declarations runs in the current scope
+                for stmt in statement.statements :
+                    completion = self._execute(stmt)
+                    if completion is not None : return completion
+                return
+            
             #creates and enters into a new nested scope
-            self.executeBlock(statement, Environment(self._environment)); return
+            return self.executeBlock(statement, Environment(self._environment, [None] * statement.size))
         
         elif isinstance(statement, Stmt.Expression) :
             #evaluates this expression
@@ -84,36 +110,69 @@ class Interpreter :
         elif isinstance(statement, Stmt.Function) :
             #defines a function in the current scope
             function = PyLoxFunction(statement, self._environment, False)
-            self._environment.define(statement.name.lexeme, function); return
+            self._define(statement, function); return
         
         elif isinstance(statement, Stmt.If) :
             #execute the 'if then/else' statement
             if self._isTruth(self._evaluate(statement.condition)) :
-                self._execute(statement.thenBranch)
+                return self._execute(statement.thenBranch)
             elif statement.elseBranch is not None :
-                self._execute(statement.elseBranch)
+                return self._execute(statement.elseBranch)
             return
         
         elif isinstance(statement, Stmt.While) :
             #execute the 'while' statement
             while self._isTruth(self._evaluate(statement.condition)) :
-                try :
-                    self._execute(statement.body)
-                except LoopControlException as control:
-                    if isinstance(control, BreakException) : break  
+                completion = self._execute(statement.body)
+                if completion is not None :
+                    if completion == Completion.BREAK : break
+                    if completion == Completion.RETURN : return completion
+            return
+        
+        elif isinstance(statement, Stmt.For) :
+            #execute the 'for' statement, in the scope of its initializer
+            previous = self._environment
+            try :
+                if statement.size : self._environment = Environment(previous, [None] * statement.size)
+                if statement.initializer is not None : self._execute(statement.initializer)
+                
+                while statement.condition is None or self._isTruth(self._evaluate(statement.condition)) :
+                    completion = self._execute(statement.body)
+                    if completion is not None :
+                        if completion == Completion.BREAK : break
+                        if completion == Completion.RETURN : return completion
+                    #a continue still runs the increment
+                    if statement.increment is not None : self._evaluate(statement.increment)
+            
+            finally :
+                self._environment = previous
             return
         
         elif isinstance(statement, Stmt.Return) :
             #executes the instruction to return a value for a given method or function
             #nil is the default return value
-            value = None if statement.value is None else self._evaluate(statement.value)
-            raise ReturnException(value)
+            #the value is kept by the interpreter, until the function call takes it
+            if statement.isTailCall and self.tailCalls :
+                function, args = self._prepareCall(statement.value)
+                if _isTailCallable(function) :
+                    #the returned call is left to the function call, which makes it instead of nesting it
+                    self.tailCall = (function, args)
+                    return Completion.RETURN
+                
+                try :
+                    self.returnValue = function.call(self, args)
+                except PyLoxRuntimeError as error :
+                    raise error.at(statement.value.paren)
+                return Completion.RETURN
+            
+            self.returnValue = None if statement.value is None else self._evaluate(statement.value)
+            return Completion.RETURN
         
         elif isinstance(statement, Stmt.Break) :
-            raise BreakException()
+            return Completion.BREAK
         
         elif isinstance(statement, Stmt.Continue) :
-            raise ContinueException()
+            return Completion.CONTINUE
                         
         elif isinstance(statement, Stmt.Print) :
             #evaluates and print this expression
@@ -123,7 +182,7 @@ class Interpreter :
         elif isinstance(statement, Stmt.Var) :
             #define this variable in the current environment
             value = None if statement.initializer is None else self._evaluate(statement.initializer)
-            self._environment.define(statement.name.lexeme, value); return
+            self._define(statement, value); return
         
         elif isinstance(statement, Stmt.Class) :
             #interprets the class declaration statement
@@ -136,26 +195,31 @@ class Interpreter :
                                 "Superclass of '{}' must be a class.".format(statement.name.lexeme))
             else : supercls = None
             
-            #define current class to allow references inside methods
-            self._environment.define(statement.name.lexeme, None)
-            
             if supercls is not None :
-                self._environment = Environment(self._environment)
-                self._environment.define("super", supercls) #super is defined in the class scope
+                self._environment = Environment(self._environment, [supercls]) #super is defined in the class scope
             
             methods = {}
             for method in statement.methods :
                 methodName = method.name.lexeme
                 methods[methodName] = PyLoxFunction(method, self._environment, isInitializer = True if methodName == "init" 
-                                                                                                  else False)
+                                                                                                  else False, isMethod = True)
             klass = PyLoxClass(statement.name.lexeme, supercls, methods)
             if supercls is not None : 
                 self._environment = self._environment.enclosing
-                
-            self._environment.assign(statement.name, klass)
             
-    def executeBlock(self, block : Stmt.Block, environment : Environment) :
+            #methods only hold the environment, so the class is still visible inside them
+            self._define(statement, klass)
+    
+    def _define(self, declaration : Stmt, value : object) -> None:
+        #defines the name of a declaration in the current scope, at the slot given by the Resolver
+        if declaration.slot is None :
+            self.globals.define(declaration.name.lexeme, value)
+        else :
+            self._environment.define(declaration.slot, value)
+            
+    def executeBlock(self, block : Stmt.Block, environment : Environment) -> int:
         #executes the block statement that defines a new nested scope
+        #returns the Completion signal of the statement that interrupted the block, if any
         
         previous = self._environment #saves the current scope
         try :
@@ -165,24 +229,63 @@ class Interpreter :
             
             #executes the statements that are in the block
             for stmt in block.statements :
-                self._execute(stmt) 
+                completion = self._execute(stmt)
+                if completion is not None : return completion
         
-        except Exception:
-            raise
         finally :
             #restores the current scope
             self._environment = previous
     
-    def _resolve(self, expr : Expr, depth : int) -> None:
-        self._locals[expr] = depth; return             
+    def _prepareCall(self, expr : Expr.Call) -> tuple:
+        #evaluates the callee and the arguments of a call, and returns the function to call with its arguments
+        if type(expr.callee) is Expr.Get :
+            return self._prepareInvoke(expr)
+        
+        callee = self._evaluate(expr.callee) #recursively evaluates callee
+        
+        args = [self._evaluate(arg) for arg in expr.args]
+        
+        if not isinstance(callee, Callable) : #check if it evaluates to a callable defined function
+            raise PyLoxRuntimeError(expr.paren, "Can only call functions and classes.")
+        
+        if len(args) != callee.arity() : 
+            raise PyLoxRuntimeError(expr.paren, "Expect {} arguments, but got {}.".format(callee.arity(), len(args)))
+        
+        return callee, args
     
-    def _findVariable(self, name : Token, expr : Expr) :
-        try :
-            distance = self._locals[expr]
-        except KeyError :
-            return self.globals.get(name)
+    def _prepareInvoke(self, expr : Expr.Call) -> tuple:
+        #prepares the call of 'object.name(args)', without binding the method to the instance first
+        get = expr.callee
+        obj = self._evaluate(get.object)
+        
+        if not isinstance(obj, PyLoxInstance) :
+            raise PyLoxRuntimeError(get.name, "Only instances have properties.")
+        
+        if get.cache is None : get.cache = InlineCache(get.name, "invoke")
+        method = get.cache.findMethod(obj)
+        if method is None :
+            #a field holding a callable, or an undefined property
+            callee = obj.get(get.name)
+            args = [self._evaluate(arg) for arg in expr.args]
+            
+            if not isinstance(callee, Callable) :
+                raise PyLoxRuntimeError(expr.paren, "Can only call functions and classes.")
         else :
-            return self._environment.getAt(distance, name.lexeme)
+            callee = method
+            args = [obj] #the instance is the first argument of a method
+            args.extend(self._evaluate(arg) for arg in expr.args)
+        
+        if len(expr.args) != callee.arity() : 
+            raise PyLoxRuntimeError(expr.paren, "Expect {} arguments, but got {}.".format(callee.arity(), len(expr.args)))
+        
+        return callee, args
+    
+    def _findVariable(self, name : Token, expr : Expr) :
+        if expr.depth is None :
+            #it was not resolved to a local scope, so it is at a slot of the globals
+            return self.globals.getSlot(expr.slot, name)
+        
+        return self._environment.getAt(expr.depth, expr.slot)
             
     def _evaluate(self, expr : Expr) -> object:
         #implements evaluation logic for each type of expression node in AST
@@ -219,14 +322,11 @@ class Interpreter :
             #assign to a variable defined in the current scope
             value = self._evaluate(expr.value)
             
-            try : 
-                #get the resolved scope of this variable
-                dist = self._locals[expr]
-            except KeyError :
+            if expr.depth is None :
                 #it is not in some local scope
                 #assume that it is in the global scope
                 try :
-                    self.globals.assign(expr.name, value)
+                    self.globals.assignSlot(expr.slot, expr.name, value)
                 except PyLoxRuntimeError as error :
                     #it is not in the global scope
                     #attempt to assign to an undefined variable
@@ -234,41 +334,34 @@ class Interpreter :
                     error.what()
             else :
                 #found in some local scope
-                #it was defined at a distance 'dist' from the current scope
+                #it was defined at a distance 'depth' from the current scope
                 #assign to the resolved variable
-                self._environment.assignAt(dist, expr.name, value)
+                self._environment.assignAt(expr.depth, expr.slot, value)
             
-            finally :
-                return value #allows cascading values
+            return value #allows cascading values
         
         elif isinstance(expr, Expr.Call) : 
-            callee = self._evaluate(expr.callee) #recursively evaluates callee
-            
-            args = [self._evaluate(arg) for arg in expr.args]
-            
-            if not isinstance(callee, Callable) : #check if it evaluates to a callable defined function
-                raise PyLoxRuntimeError(expr.paren, "Can only call functions and classes.")
-            
-            function = callee
-            
-            if len(args) != function.arity() : 
-                raise PyLoxRuntimeError(expr.paren, "Expect {} arguments, but got {}.".format(function.arity(), len(args)))
-            
-            return function.call(self, args) #calls the function with their specific arguments
+            function, args = self._prepareCall(expr)
+            try :
+                return function.call(self, args) #calls the function with their specific arguments
+            except RecursionError :
+                #the Lox calls nest Python calls, the error is raised by the deepest call only
+                raise PyLoxRuntimeError(expr.paren, "Stack overflow.") from None
+            except PyLoxRuntimeError as error :
+                raise error.at(expr.paren)
         
         elif isinstance(expr, Expr.This) :
             #'this' refers to a class instance 
             return self._findVariable(expr.keyword, expr)
         
         elif isinstance(expr, Expr.Super) :
-            dist = self._locals[expr]
-            superclass = self._environment.getAt(dist, "super") #where the superclass is defined
-            #'this' is always bound right inside the environment in which 'super' is stored
-            thisObject = self._environment.getAt(dist - 1, "this")
+            superclass = self._environment.getAt(expr.depth, expr.slot) #where the superclass is defined
+            #'this' is always bound right inside the environment in which 'super' is stored, at its first slot
+            thisObject = self._environment.getAt(expr.depth - 1, 0)
             
             method = superclass.findMethod(expr.method.lexeme)
             if method is None :
-                raise PyLoxRuntimeError(expr.method, "Undefined property '{}'.".format(expr.name.lexeme))
+                raise PyLoxRuntimeError(expr.method, "Undefined property '{}'.".format(expr.method.lexeme))
                 
             return method.bind(thisObject)
         
@@ -276,7 +369,8 @@ class Interpreter :
             obj = self._evaluate(expr.object)
             
             if isinstance(obj, PyLoxInstance) :
-                return obj.get(expr.name)
+                if expr.cache is None : expr.cache = InlineCache(expr.name, "get")
+                return expr.cache.get(obj)
             
             else : raise PyLoxRuntimeError(expr.name, "Only instances have properties.")
         
@@ -287,7 +381,8 @@ class Interpreter :
                 raise PyLoxRuntimeError(expr.name, "Only instances have fields.")
             
             value = self._evaluate(expr.value)
-            obj.set(expr.name, value)
+            if expr.cache is None : expr.cache = InlineCache(expr.name, "set")
+            expr.cache.set(obj, value)
             return value
             
         elif isinstance(expr, Expr.Grouping) :
@@ -313,25 +408,8 @@ class Interpreter :
             left = self._evaluate(expr.left)
             right = self._evaluate(expr.right)
             
-            skipOperandsVerification = {TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL, TokenType.PLUS}
-            
-            if expr.operator.tokenValue not in skipOperandsVerification:
-                self._checkNumberOperands(expr.operator, left, right)
-            
-            _operations = {
-                TokenType.GREATER       : (lambda : float(left) > float(right)),
-                TokenType.GREATER_EQUAL : (lambda : float(left) >= float(right)),
-                TokenType.LESS          : (lambda : float(left) < float(right)),
-                TokenType.LESS_EQUAL    : (lambda : float(left) <= float(right)),
-                TokenType.EQUAL_EQUAL   : (lambda :    (self._isEqual(left, right))),
-                TokenType.BANG_EQUAL    : (lambda : not(self._isEqual(left, right))),
-                TokenType.MINUS         : (lambda : float(left) - float(right)),
-                TokenType.STAR          : (lambda : float(left) * float(right)),
-                TokenType.MOD           : (lambda : self._division(expr.operator, left, right, True)),
-                TokenType.SLASH         : (lambda : self._division(expr.operator, left, right, False)),
-                TokenType.PLUS          : (lambda : self._addOrConcatenate(expr.operator, left, right))
-            }
-            return _operations[expr.operator.tokenValue]()
+            #the handler of each operator is bound once, in the _binaryOperations table
+            return self._binaryOperations[expr.operator.tokenValue](self, expr.operator, left, right)
         
         elif isinstance(expr, Expr.Ternary) :
             if self._isTruth(self._evaluate(expr.condition)) :    
@@ -340,6 +418,69 @@ class Interpreter :
                 return self._evaluate(expr.elseValue)    
     
     
+    #handlers of the binary operators, as : handler(self, operator, left, right)
+    #+, -, *, < and <= are tried first with two numbers, skipping _checkNumberOperands
+    
+    def _plus(self, operator : Token, left : object, right : object) -> object:
+        if type(left) is float and type(right) is float : return left + right
+        return self._addOrConcatenate(operator, left, right)
+    
+    def _minus(self, operator : Token, left : object, right : object) -> float:
+        if type(left) is float and type(right) is float : return left - right
+        self._checkNumberOperands(operator, left, right)
+        return left - right
+    
+    def _star(self, operator : Token, left : object, right : object) -> float:
+        if type(left) is float and type(right) is float : return left * right
+        self._checkNumberOperands(operator, left, right)
+        return left * right
+    
+    def _less(self, operator : Token, left : object, right : object) -> bool:
+        if type(left) is float and type(right) is float : return left < right
+        self._checkNumberOperands(operator, left, right)
+        return left < right
+    
+    def _lessEqual(self, operator : Token, left : object, right : object) -> bool:
+        if type(left) is float and type(right) is float : return left <= right
+        self._checkNumberOperands(operator, left, right)
+        return left <= right
+    
+    def _greater(self, operator : Token, left : object, right : object) -> bool:
+        self._checkNumberOperands(operator, left, right)
+        return left > right
+    
+    def _greaterEqual(self, operator : Token, left : object, right : object) -> bool:
+        self._checkNumberOperands(operator, left, right)
+        return left >= right
+    
+    def _slash(self, operator : Token, left : object, right : object) -> float:
+        self._checkNumberOperands(operator, left, right)
+        return self._division(operator, left, right, False)
+    
+    def _mod(self, operator : Token, left : object, right : object) -> float:
+        self._checkNumberOperands(operator, left, right)
+        return self._division(operator, left, right, True)
+    
+    def _equalEqual(self, operator : Token, left : object, right : object) -> bool:
+        return self._isEqual(left, right)
+    
+    def _bangEqual(self, operator : Token, left : object, right : object) -> bool:
+        return not self._isEqual(left, right)
+    
+    _binaryOperations = {
+        TokenType.PLUS          : _plus,
+        TokenType.MINUS         : _minus,
+        TokenType.STAR          : _star,
+        TokenType.LESS          : _less,
+        TokenType.LESS_EQUAL    : _lessEqual,
+        TokenType.GREATER       : _greater,
+        TokenType.GREATER_EQUAL : _greaterEqual,
+        TokenType.SLASH         : _slash,
+        TokenType.MOD           : _mod,
+        TokenType.EQUAL_EQUAL   : _equalEqual,
+        TokenType.BANG_EQUAL    : _bangEqual
+    }
+    
     def _checkNumberOperands(self, operator : Token, *operands : object) -> None:
         #check if all operands are of the same numeric type (float)
         
@@ -367,9 +508,10 @@ class Interpreter :
             #adds two numbers as <float> + <float>
             return float(left) + float(right)
         
-        elif isinstance(left, str) or isinstance(right, str) :
-            #concatenate left and right as <str> + <str>
-            return str(left) + str(right)
+        elif isinstance(left, (str, Rope)) or isinstance(right, (str, Rope)) :
+            #concatenate left and right as <str> + <str>, long strings are kept as ropes
+            return concatenate(left if isinstance(left, (str, Rope)) else str(left),
+                               right if isinstance(right, (str, Rope)) else str(right))
         
         else :
             raise PyLoxRuntimeError(operator, "Operands must be two numbers or two strings.")
@@ -391,22 +533,11 @@ class Interpreter :
             return False
         
         if type(left) != type(right) :
-            return False
+            #a rope is equal to the string of its text
+            return (type(left) is Rope or type(right) is Rope) and left == right
         
         return left == right
     
     def _stringify(self, obj : object) -> str: 
         #returns a string representation (str) for the object
-        
-        if obj == None : return "nil"
-        
-        elif isinstance(obj, float) :
-            text = str(obj)
-            #discards zeroed mantissa
-            return (text[:-2] if text[-2:] == ".0" else text)
-        
-        elif obj == True : return "true"
-        
-        elif obj == False : return "false"
-        
-        return str(obj)
+        return stringify(obj)
@@ -0,0 +1,178 @@
+from . import Stmt
+from . import Expr
+from .TokenType import *
+from .PyLoxExceptions import PyLoxRuntimeError
+from .Rope import Rope
+from .Interpreter import _toEcho
+
+__all__ = ["Optimizer"]
+
+"""
+    The Optimizer rewrites the resolved syntax tree before it is executed :
+    operations whose operands are all literals are folded into a literal of their result,
+    and the branches and loops that a constant condition makes unreachable are removed.
+    Operations that would fail at runtime, such as a division by zero, are kept as they are,
+    so their error is still raised when they are executed.
+"""
+
+class Optimizer :
+
+    def __init__(self, interpreter) :
+        self._interpreter = interpreter #gives the semantics of the operators and of the truth values
+
+    def Optimize(self, statement : Stmt) -> Stmt:
+        #returns the optimized statement, or None if it has no effect
+        if isinstance(statement, Stmt.Block) :
+            statement.statements = self._optimizeAll(statement.statements); return statement
+
+        elif isinstance(statement, Stmt.Expression) :
+            statement.expression = self._fold(statement.expression); return statement
+
+        elif isinstance(statement, Stmt.Print) :
+            statement.expression = self._fold(statement.expression); return statement
+
+        elif isinstance(statement, Stmt.Var) :
+            if statement.initializer is not None :
+                statement.initializer = self._fold(statement.initializer)
+            return statement
+
+        elif isinstance(statement, Stmt.Return) :
+            if statement.value is not None :
+                statement.value = self._fold(statement.value)
+            return statement
+
+        elif isinstance(statement, Stmt.Function) :
+            self.Optimize(statement.body); return statement
+
+        elif isinstance(statement, Stmt.Class) :
+            for method in statement.methods :
+                self.Optimize(method)
+            return statement
+
+        elif isinstance(statement, Stmt.If) :
+            statement.condition = self._fold(statement.condition)
+            thenBranch = self.Optimize(statement.thenBranch)
+            elseBranch = None if statement.elseBranch is None else self.Optimize(statement.elseBranch)
+
+            if isinstance(statement.condition, Expr.Literal) :
+                #only the branch selected by the condition can run
+                return thenBranch if self._interpreter._isTruth(statement.condition.value) else elseBranch
+
+            if thenBranch is None :
+                thenBranch = Stmt.Block([]) #the condition is still evaluated
+            statement.thenBranch = thenBranch
+            statement.elseBranch = elseBranch
+            return statement
+
+        elif isinstance(statement, Stmt.While) :
+            statement.condition = self._fold(statement.condition)
+            if isinstance(statement.condition, Expr.Literal) and not self._interpreter._isTruth(statement.condition.value) :
+                return None #the body never runs
+
+            body = self.Optimize(statement.body)
+            statement.body = Stmt.Block([]) if body is None else body
+            return statement
+
+        elif isinstance(statement, Stmt.For) :
+            if statement.initializer is not None :
+                statement.initializer = self.Optimize(statement.initializer)
+            if statement.increment is not None :
+                statement.increment = self._fold(statement.increment)
+
+            if statement.condition is not None :
+                statement.condition = self._fold(statement.condition)
+                if isinstance(statement.condition, Expr.Literal) :
+                    if not self._interpreter._isTruth(statement.condition.value) :
+                        #the body never runs, only the initializer is kept, in the same scope
+                        block = Stmt.Block([] if statement.initializer is None else [statement.initializer])
+                        block.size = statement.size
+                        return block
+                    statement.condition = None #an always true condition is not evaluated
+
+            body = self.Optimize(statement.body)
+            statement.body = Stmt.Block([]) if body is None else body
+            return statement
+
+        return statement
+
+    def _optimizeAll(self, statements : tuple) -> tuple:
+        optimized = (self.Optimize(statement) for statement in statements)
+        return tuple(statement for statement in optimized if statement is not None)
+
+    def _fold(self, expr : Expr) -> Expr:
+        #returns the expression with its constant operations folded
+        if isinstance(expr, Expr.Literal) or isinstance(expr, Expr.Variable) :
+            return expr
+
+        elif isinstance(expr, Expr.Grouping) :
+            return self._result(self._fold(expr.expression))
+
+        elif isinstance(expr, Expr.Binary) :
+            expr.left = self._fold(expr.left)
+            expr.right = self._fold(expr.right)
+            if isinstance(expr.left, Expr.Literal) and isinstance(expr.right, Expr.Literal) :
+                operation = self._interpreter._binaryOperations[expr.operator.tokenValue]
+                try :
+                    value = operation(self._interpreter, expr.operator, expr.left.value, expr.right.value)
+                except PyLoxRuntimeError :
+                    return expr #the error is raised when the expression is executed
+                #a literal keeps the flattened text of a concatenation
+                return Expr.Literal(str(value) if isinstance(value, Rope) else value)
+            return expr
+
+        elif isinstance(expr, Expr.Unary) :
+            expr.right = self._fold(expr.right)
+            if isinstance(expr.right, Expr.Literal) :
+                value = expr.right.value
+                if expr.operator.tokenValue == TokenType.BANG :
+                    return Expr.Literal(not self._interpreter._isTruth(value))
+                if expr.operator.tokenValue == TokenType.MINUS and isinstance(value, float) :
+                    return Expr.Literal(-value)
+            return expr
+
+        elif isinstance(expr, Expr.Logical) :
+            expr.left = self._fold(expr.left)
+            expr.right = self._fold(expr.right)
+            if isinstance(expr.left, Expr.Literal) :
+                #a constant left operand decides whether the result is itself or the right operand
+                isTrue = self._interpreter._isTruth(expr.left.value)
+                if isTrue == (expr.operator.tokenValue == TokenType.OR) :
+                    return expr.left
+                return self._result(expr.right)
+            return expr
+
+        elif isinstance(expr, Expr.Ternary) :
+            expr.condition = self._fold(expr.condition)
+            expr.thenValue = self._fold(expr.thenValue)
+            expr.elseValue = self._fold(expr.elseValue)
+            if isinstance(expr.condition, Expr.Literal) :
+                return self._result(expr.thenValue if self._interpreter._isTruth(expr.condition.value) else expr.elseValue)
+            return expr
+
+        elif isinstance(expr, Expr.Chain) :
+            expr.left = self._fold(expr.left)
+            expr.right = self._fold(expr.right)
+            if isinstance(expr.left, Expr.Literal) :
+                return self._result(expr.right) #the left operand has no effect
+            return expr
+
+        elif isinstance(expr, Expr.Assign) :
+            expr.value = self._fold(expr.value); return expr
+
+        elif isinstance(expr, Expr.Call) :
+            expr.callee = self._fold(expr.callee)
+            expr.args = tuple(self._fold(arg) for arg in expr.args); return expr
+
+        elif isinstance(expr, Expr.Get) :
+            expr.object = self._fold(expr.object); return expr
+
+        elif isinstance(expr, Expr.Set) :
+            expr.object = self._fold(expr.object)
+            expr.value = self._fold(expr.value); return expr
+
+        return expr
+
+    def _result(self, expr : Expr) -> Expr:
+        #an operand that replaces an operation keeps a grouping, if the prompt would not echo it otherwise
+        if type(expr) in _toEcho : return expr
+        return Expr.Grouping(expr)
@@ -10,28 +10,32 @@ __all__ = ["Parser"]
     The Parser performs the Syntax Analysis of a given token list, 
     where it arranges these tokens in a Syntax Tree structure, 
     that reflects the structure of the program.
+    Tokens are consumed one by one, so they can be produced by the Scanner while parsing,
+    and only the current and the last consumed tokens are kept.
 """
 
 class Parser(object) :
    
-    def __init__(self, tokens : list) :
-        self._current = 0       # works as a pointer to a token in the token list
-        self._tokens = tokens   # the token list to be processed
-        self._hadError = False  # defines the error state of Parser
+    def __init__(self, tokens : iter) :
+        self._tokens = iter(tokens)         # the tokens to be processed, a list or an iterator 
+        self._current = next(self._tokens)  # the token to be consumed next
+        self._last = None                   # the last consumed token
+        self._hadError = False              # defines the error state of Parser
     
     def Parse(self) -> list:
         """
             matches the rule :
                 program -> declaration* EOF
         """
-        statements = []
+        return list(self.Declarations())
+    
+    def Declarations(self) -> iter:
+        #yields the top-level declarations one by one, as soon as they are parsed
         
         while not self._isAtEnd() :
             stmt = self._declaration()
             if stmt is not None : 
-                statements.append(stmt)
-                
-        return statements
+                yield stmt
     
     def _declaration(self) -> Stmt:
         """
@@ -204,15 +208,8 @@ class Parser(object) :
             
                 for(initializer; condition; increment) statement;
            
-            as a while loop:
-            
-                {
-                   initializer
-                       while(condition){
-                           statement
-                           increment
-                       }
-                }
+            as a For statement, whose initializer has its own scope around the loop,
+            and where 'continue' still runs the increment.
         """
         self._consume(TokenType.LEFT_PAREN, errorMessage = "Expect '(' after 'for'.")
             
@@ -221,29 +218,17 @@ class Parser(object) :
         elif self._matchAny(TokenType.VAR) : initializer = self._varDeclaration()
         else : initializer = self._exprStmt()
             
-        #condition expression is optional, validates true condition (infinity loop) if no condition is provided
-        condition = self._expression() if not self._check(TokenType.SEMICOLON) else Expr.Literal(True)
+        #condition expression is optional, the loop runs until a break or return if no condition is provided
+        condition = self._expression() if not self._check(TokenType.SEMICOLON) else None
         self._consume(TokenType.SEMICOLON, errorMessage = "Expect ';' after loop condition.")
             
         #increment expression is optional
         increment = self._expression() if not self._check(TokenType.RIGHT_PAREN) else None
         self._consume(TokenType.RIGHT_PAREN, errorMessage = "Expect ')' after for clauses.")
             
-        statements = [] #list of statements in the while statement body
+        body = self._statement() #parses the statement in the for loop body
             
-        statements.append(self._statement()) #parses the statement in the for loop body
-        if increment is not None : 
-            #adds increment expression to the end of the while body
-            statements.append(Stmt.Expression(increment))
-            
-        body = Stmt.Block(statements)
-            
-        if initializer is None :
-            #no initializer is provided, so it parses it as a normal while statement
-            return Stmt.While(condition, body)
-        else :
-            #an initializer is provided, so creates a block with the initializer and the while statements
-            return Stmt.Block([initializer, Stmt.While(condition, body)]) 
+        return Stmt.For(initializer, condition, increment, body)
     
     def _printStmt(self) -> Stmt:
         """
@@ -594,8 +579,9 @@ class Parser(object) :
         #consumes the _current Token in _tokens and returns it
         
         if not self._isAtEnd() : 
-            self._current += 1
-        return self._previous()    
+            self._last = self._current
+            self._current = next(self._tokens)
+        return self._last    
     
     def _consume(self, expected : TokenType, errorMessage : str) -> Token: 
         #consumes _current token if it matches the expected token, else raise PyLoxParseError 
@@ -610,11 +596,11 @@ class Parser(object) :
          
     def _peek(self) -> Token :
         #returns the _current Token from _tokens
-        return self._tokens[self._current]
+        return self._current
         
     def _previous(self) -> Token :
         #returns the last consumed Token from _tokens
-        return self._tokens[self._current - 1]
+        return self._last
         
     def _synchronize(self) -> None :
         #discard tokens until it finds a statement boundary
@@ -634,7 +620,7 @@ class Parser(object) :
         
         #tries to find a beginning or end of an instruction 
         while not self._isAtEnd() :
-            if self._previous().tokenValue in endStatement :
+            if self._previous() is not None and self._previous().tokenValue in endStatement :
                 return
             elif self._peek().tokenValue in beginStatement :
                 return
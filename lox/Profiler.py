@@ -0,0 +1,181 @@
+import sys
+import time
+from .Token import *
+from . import Expr
+from . import Stmt
+from .PyLoxFunction import *
+from .PyLoxClass import *
+from .Interpreter import *
+from .ClosureCompiler import *
+from .VM import *
+
+__all__ = ["Profiler"]
+
+"""
+    The Profiler measures where a running script spends its time, when PyLox runs with --profile.
+    While it is active, the calls of functions and classes and the execution of statements are instrumented :
+    it counts the calls of each function with their inclusive and exclusive time,
+    and the executions of each source line with the time spent in its own statements.
+    The time of a line excludes its nested statements, and the time of the functions called from it.
+    Lines are measured by the tree and closure engines, as the VM runs statements without dispatching them.
+    The call stacks can also be written in the collapsed format of flame graph tools.
+"""
+
+_clock = time.perf_counter
+
+class Profiler :
+    TOP = 20 #rows of each table of the report
+
+    def __init__(self) :
+        self.functions = {} #calls, inclusive and exclusive time of each function
+        self.lines = {}     #executions and exclusive time of each source line
+        self.stacks = {}    #exclusive time of each call stack, from the script to a function
+        self._calls = [[None, 0.0, 0.0]]  #frames of the active calls : name, start, time of its callees
+        self._active = {}   #active calls of each function, its inclusive time is only counted by the outermost
+        self._statements = [0.0] #time of the nested statements of each active statement
+        self._lineOf = {}   #source line of each statement
+        self._patched = []
+
+    def start(self, interpreter) -> None:
+        #instruments the calls and the statements run by the interpreter
+        profiler = self
+
+        for cls in (PyLoxFunction, CompiledFunction, VMFunction, PyLoxClass) :
+            original = cls.__dict__["call"]
+            def call(callee, interpreter, args, original = original) :
+                profiler._enter(profiler._name(callee))
+                try :
+                    return original(callee, interpreter, args)
+                finally :
+                    profiler._exit()
+            self._patch(cls, "call", call)
+        #every call is made through the call methods : the VM does not run them in its own frames,
+        #and the calls in tail position are nested in the calling function instead of replacing it
+        self._patch(VM, "inlineCalls", False)
+        self._patch(Interpreter, "tailCalls", False)
+
+        original = Interpreter.__dict__["_execute"]
+        def execute(interpreter, statement, original = original) :
+            start = profiler._enterStatement()
+            try :
+                return original(interpreter, statement)
+            finally :
+                profiler._exitStatement(statement, start)
+        self._patch(Interpreter, "_execute", execute)
+
+        original = ClosureCompiler.__dict__["_compileStmt"]
+        def compileStmt(compiler, statement, original = original) :
+            code = original(compiler, statement)
+            def timed(env) :
+                start = profiler._enterStatement()
+                try :
+                    return code(env)
+                finally :
+                    profiler._exitStatement(statement, start)
+            return timed
+        self._patch(ClosureCompiler, "_compileStmt", compileStmt)
+
+        #the top-level statements run inside the frame of the script
+        interpret = interpreter.Interpret
+        def Interpret(statements) :
+            profiler._enter("<script>")
+            try :
+                return interpret(statements)
+            finally :
+                profiler._exit()
+        interpreter.Interpret = Interpret
+        self._patched.append((interpreter, "Interpret", None))
+
+    def stop(self) -> None:
+        #removes the instrumentation
+        for owner, name, original in reversed(self._patched) :
+            if original is None : delattr(owner, name)
+            else : setattr(owner, name, original)
+        self._patched.clear()
+
+    def _patch(self, owner, name : str, replacement) -> None:
+        self._patched.append((owner, name, owner.__dict__[name]))
+        setattr(owner, name, replacement)
+
+    def _name(self, callee) -> str:
+        if isinstance(callee, PyLoxClass) : return callee._name
+        name = callee.declaration.name
+        return "{}:{}".format(name.lexeme, name.line)
+
+    def _enter(self, name : str) -> None:
+        self._calls.append([name, _clock(), 0.0])
+        self._active[name] = self._active.get(name, 0) + 1
+
+    def _exit(self) -> None:
+        name, start, callees = self._calls.pop()
+        elapsed = _clock() - start
+        self._calls[-1][2] += elapsed
+
+        stats = self.functions.get(name)
+        if stats is None : stats = self.functions[name] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[2] += elapsed - callees
+
+        self._active[name] -= 1
+        if not self._active[name] :
+            stats[1] += elapsed #a recursive call is already part of the outermost one
+
+        stack = ";".join([frame[0] for frame in self._calls[1:]] + [name])
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + elapsed - callees
+
+    def _enterStatement(self) -> float:
+        self._statements.append(0.0)
+        return _clock()
+
+    def _exitStatement(self, statement : Stmt, start : float) -> None:
+        elapsed = _clock() - start
+        nested = self._statements.pop()
+        self._statements[-1] += elapsed
+
+        line = self._lineOf.get(statement)
+        if line is None : line = self._lineOf[statement] = _line(statement)
+
+        stats = self.lines.get(line)
+        if stats is None : stats = self.lines[line] = [0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed - nested
+
+    def report(self, file = sys.stderr) -> None:
+        #prints the busiest functions and lines, by their exclusive time
+        print("{:<24} {:>10} {:>14} {:>14}".format("function", "calls", "inclusive ms", "exclusive ms"), file = file)
+        functions = sorted(self.functions.items(), key = lambda item : item[1][2], reverse = True)
+        for name, (calls, inclusive, exclusive) in functions[:Profiler.TOP] :
+            print("{:<24} {:>10} {:>14.3f} {:>14.3f}".format(name, calls, 1000 * inclusive, 1000 * exclusive), file = file)
+
+        print(file = file)
+        if not self.lines :
+            print("lines are only measured by the tree and closure engines", file = file); return
+
+        total = sum(stats[1] for stats in self.lines.values()) or 1.0
+        print("{:>6} {:>12} {:>14} {:>7}".format("line", "executions", "exclusive ms", "%"), file = file)
+        lines = sorted(self.lines.items(), key = lambda item : item[1][1], reverse = True)
+        for line, (executions, exclusive) in lines[:Profiler.TOP] :
+            print("{:>6} {:>12} {:>14.3f} {:>6.1f}%".format("-" if line == 0 else line, executions, 1000 * exclusive,
+                                                            100.0 * exclusive / total), file = file)
+
+    def writeStacks(self, path : str) -> None:
+        #writes the call stacks in the collapsed format, weighted by their exclusive time in microseconds
+        with open(path, "w") as writer :
+            for stack, elapsed in sorted(self.stacks.items()) :
+                writer.write("{} {}\n".format(stack, int(elapsed * 1e6)))
+
+def _line(node) -> int:
+    #returns the line of the first token found in a statement, or 0
+    if isinstance(node, Token) : return node.line
+
+    if isinstance(node, tuple) or isinstance(node, list) :
+        children = node
+    elif isinstance(node, Stmt.Stmt) or isinstance(node, Expr.Expr) :
+        children = (getattr(node, field) for cls in type(node).__mro__ for field in getattr(cls, "__slots__", ()))
+    else :
+        return 0
+
+    for child in children :
+        line = _line(child)
+        if line : return line
+    return 0
@@ -1,6 +1,7 @@
 from .Callable import *
 from .PyLoxInstance import *
 from .PyLoxFunction import *
+from .Shape import *
 
 __all__ = ["PyLoxClass"]
 
@@ -9,6 +10,12 @@ class PyLoxClass(Callable) :
         self._supercls = superclass
         self._name = name 
         self._methods = methods
+        
+        #flattened method resolution table : the inherited methods, overridden by the methods of this class
+        self._table = {} if superclass is None else dict(superclass._table)
+        self._table.update(methods)
+        
+        self.rootShape = Shape() #shape of the instances without fields, which is only used by this class
     
     def call(self, interpreter, arguments : list) -> PyLoxInstance:
         #calling a class returns an instance of it
@@ -17,19 +24,14 @@ class PyLoxClass(Callable) :
         
         initializer = self.findMethod("init") #returns a PyLoxFunction object 
         if initializer is not None :
-            #define 'this' in the surrounding scope first, so calls the init method
-            initializer.bind(instance).call(interpreter, arguments)
+            #calls the init method, with 'this' as its first argument
+            initializer.call(interpreter, [instance] + arguments)
         
         return instance
     
     def findMethod(self, methodName : str) -> PyLoxFunction:
         #tries to find a method defined inside the current class or in superclass
-        if methodName in self._methods : 
-            return self._methods[methodName]
-        elif self._supercls is not None :
-            return self._supercls.findMethod(methodName)
-        
-        else : return None
+        return self._table.get(methodName)
         
     def arity(self) -> int:
         #returns the arity of the constructor
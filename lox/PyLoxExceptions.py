@@ -1,14 +1,6 @@
 from .Token import *
 from .TokenType import *
 
-class ReturnException(Exception) :
-    def __init__(self, value : object) :
-        self._value = value
-
-class LoopControlException(Exception) : pass
-class BreakException(LoopControlException) : pass
-class ContinueException(LoopControlException) : pass
-
 class PyLoxException(Exception) :
 
     @staticmethod
@@ -48,6 +40,11 @@ class PyLoxRuntimeError(PyLoxException) :
     def __init__(self, token : Token, message : str) :
         self._token = token
         self._message = message
+    
+    def at(self, token : Token) -> "PyLoxRuntimeError":
+        #locates an error raised by a native function, which has no token, at the call that made it
+        if self._token is None : self._token = token
+        return self
             
     def what(self) -> None:
         return self.report(self._token.line, "at '{}'".format(self._token.lexeme), self._message)
@@ -2,44 +2,43 @@ from . import Stmt
 from .Environment import Environment
 from .Callable import *
 from .PyLoxInstance import *
-from .PyLoxExceptions import ReturnException
+from .Completion import *
 
-__all__ = ["PyLoxFunction"]
+__all__ = ["PyLoxFunction", "PyLoxBoundMethod"]
 
 class PyLoxFunction(Callable) : 
-    def __init__(self, declaration : Stmt.Function, closure : Environment, isInitializer : bool):
+    def __init__(self, declaration : Stmt.Function, closure : Environment, isInitializer : bool, isMethod : bool = False):
         self.declaration = declaration
         self.closure = closure
         self._isInitializer = isInitializer
+        #a method receives 'this' before its arguments, in the first slot of the call
+        self._locals = [None] * (declaration.size - len(declaration.params) - isMethod) #body declarations of a call
         
     def call(self, interpreter, args : list) -> object:
-        #creates a new environment for this function,
-        #binding all the callee args to the expected function parameter,
+        #creates a single environment for this call, sized for all its variables,
+        #binding all the callee args to the expected function parameters in the first slots,
         #then, perform all statements in the function body.
-        environment = Environment(self.closure)
-        for i in range(len(self.declaration.params)) :
-            environment.define((self.declaration.params)[i].lexeme, args[i])
-        
-        try :
-            interpreter.executeBlock(self.declaration.body, Environment(environment));
-        
-        except ReturnException as returnValue:
-            if self._isInitializer :
-                #allows to return 'this' inside an init method, used with an empty return statement
-                return self.closure.getAt(0, "this")
-            else : 
-                return returnValue._value
-        else :
-            if self._isInitializer : return self.closure.getAt(0, "this") #an init method can only return 'this' by default
+        function = self
+        while True :
+            environment = Environment(function.closure, args + function._locals)
+            
+            completion = interpreter.executeBlock(function.declaration.body, environment)
+            
+            #an init method can only return 'this', even with an empty return statement
+            if function._isInitializer : return args[0]
+            
+            if completion != Completion.RETURN : return None #"nil" is the default return value
             
-            return None #"nil" is the default return value
+            if interpreter.tailCall is None : return interpreter.returnValue
+            
+            #a call in tail position runs in the loop of this call, instead of nesting a new one
+            function, args = _takeTailCall(interpreter)
+            if not isinstance(function, PyLoxFunction) : return function.call(interpreter, args)
     
     def bind(self, instance : PyLoxInstance) :
         #bind is used in methods, to allow the "this" references to the instance in which it is bound, 
-        #"this" is defined in a nested environment within the original method closure  
-        environment = Environment(self.closure)
-        environment.define("this", instance)
-        return PyLoxFunction(self.declaration, environment, self._isInitializer)
+        #method calls that are not made through the bound method pass the instance to call themselves
+        return PyLoxBoundMethod(self, instance)
         
     def arity(self) -> int:
         #returns the expected length of the function's parameter list
@@ -48,3 +47,34 @@ class PyLoxFunction(Callable) :
     def __str__(self) -> str:
         #runtime representation of PyLox function objects
         return "<function {}>".format(self.declaration.name.lexeme)
+
+
+def _isTailCallable(function) -> bool:
+    #only Lox functions and methods are left to the loop of the calling function,
+    #other callables are called at the return statement, where their runtime errors are located
+    if isinstance(function, PyLoxBoundMethod) : function = function.method
+    return isinstance(function, PyLoxFunction)
+
+def _takeTailCall(interpreter) -> tuple:
+    #returns the function and the arguments of the pending tail call, with bound methods unwrapped
+    function, args = interpreter.tailCall
+    interpreter.tailCall = None
+    
+    if isinstance(function, PyLoxBoundMethod) :
+        return function.method, [function.instance] + args
+    return function, args
+
+class PyLoxBoundMethod(Callable) :
+    def __init__(self, method : PyLoxFunction, instance : PyLoxInstance) :
+        self.method = method
+        self.instance = instance
+    
+    def call(self, interpreter, args : list) -> object:
+        #'this' is passed to the method as its first argument
+        return self.method.call(interpreter, [self.instance] + args)
+    
+    def arity(self) -> int:
+        return self.method.arity()
+    
+    def __str__(self) -> str:
+        return str(self.method)
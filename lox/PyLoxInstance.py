@@ -4,15 +4,19 @@ from .PyLoxExceptions import PyLoxRuntimeError
 __all__ = ["PyLoxInstance"]
 
 class PyLoxInstance :
+    __slots__ = ("_klass", "_shape", "_values")
+    
     def __init__(self, klass) :
         self._klass = klass #class declaration
-        self._fields = {} #define attributes here
+        self._shape = klass.rootShape #layout of the fields, shared with other instances
+        self._values = [] #values of the fields, at the slots given by the shape
     
     def get(self, name : Token) :
         #return some property of this instance
-        if name.lexeme in self._fields :
+        slot = self._shape.slots.get(name.lexeme)
+        if slot is not None :
             #returns an attribute's state
-            return self._fields[name.lexeme]
+            return self._values[slot]
         
         method = self._klass.findMethod(name.lexeme)
         if method is not None :
@@ -21,9 +25,22 @@ class PyLoxInstance :
         
         raise PyLoxRuntimeError(name, "Undefined property '{}'.".format(name.lexeme))
     
+    def findMethod(self, name : Token) :
+        #returns the unbound method called by 'instance.name(...)', 
+        #or None if name is a field or is not a method of the class
+        if name.lexeme in self._shape.slots : return None
+        
+        return self._klass.findMethod(name.lexeme)
+    
     def set(self, name : Token, value : object) :
         #defines the state/value of an instance attribute
-        self._fields[name.lexeme] = value; return
+        slot = self._shape.slots.get(name.lexeme)
+        if slot is not None :
+            self._values[slot] = value; return
+        
+        #a new field moves the instance to the next shape
+        self._shape = self._shape.transition(name.lexeme)
+        self._values.append(value)
     
     def __str__(self) :
         #runtime representation of PyLox class instance objects
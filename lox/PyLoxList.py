@@ -0,0 +1,134 @@
+from .Callable import *
+from .PyLoxInstance import *
+from .PyLoxFunction import *
+from .PyLoxExceptions import PyLoxRuntimeError
+from .Rope import Rope
+from .Shape import *
+from .Stringify import *
+
+__all__ = ["PyLoxList", "PyLoxListClass"]
+
+"""
+    A PyLoxList is a Lox list, created by calling the native class List, as in 'var items = List();'.
+    Its elements are kept in a python list, and its methods are native functions :
+        append(value), get(index), set(index, value), len(), pop(), slice(start, end), sort() and indexOf(value).
+    A list is an instance of the List class, so its methods are found and called as the methods of any other instance.
+    The runtime errors of the native methods have no token : they are located at the call that made them.
+"""
+
+class PyLoxList(PyLoxInstance) :
+    __slots__ = ("elements",)
+
+    _printing = set() #lists being converted into a string, a list printed inside itself is shown as [...]
+
+    def __init__(self, klass, elements : list) :
+        super().__init__(klass)
+        self.elements = elements
+
+    def __str__(self) :
+        if id(self) in PyLoxList._printing : return "[...]"
+
+        PyLoxList._printing.add(id(self))
+        try :
+            return "[" + ", ".join(stringify(element) for element in self.elements) + "]"
+        finally :
+            PyLoxList._printing.discard(id(self))
+
+class NativeMethod(Callable) :
+    def __init__(self, name : str, arity : int, function) :
+        self._name = name
+        self._arity = arity
+        self._function = function #called with the interpreter, the list and the arguments
+
+    def call(self, interpreter, args : list) -> object:
+        #the list is the first argument, as for the methods of Lox classes
+        return self._function(interpreter, *args)
+
+    def bind(self, instance : PyLoxList) :
+        return PyLoxBoundMethod(self, instance)
+
+    def arity(self) -> int:
+        return self._arity
+
+    def __str__(self) -> str:
+        return "<native method {}>".format(self._name)
+
+class PyLoxListClass(Callable) :
+    def __init__(self) :
+        self._name = "List"
+        self.rootShape = Shape() #a list can also get fields, as other instances
+        self._methods = {
+            "append"  : NativeMethod("append", 1, _append),
+            "get"     : NativeMethod("get", 1, _get),
+            "set"     : NativeMethod("set", 2, _set),
+            "len"     : NativeMethod("len", 0, _len),
+            "pop"     : NativeMethod("pop", 0, _pop),
+            "slice"   : NativeMethod("slice", 2, _slice),
+            "sort"    : NativeMethod("sort", 0, _sort),
+            "indexOf" : NativeMethod("indexOf", 1, _indexOf)
+        }
+
+    def call(self, interpreter, arguments : list) -> PyLoxList:
+        #calling List returns a new empty list
+        return PyLoxList(self, [])
+
+    def findMethod(self, methodName : str) -> NativeMethod:
+        return self._methods.get(methodName)
+
+    def arity(self) -> int:
+        return 0
+
+    def __str__(self) :
+        return "<native class List>"
+
+def _append(interpreter, this : PyLoxList, value : object) -> None:
+    this.elements.append(value)
+
+def _get(interpreter, this : PyLoxList, index : object) -> object:
+    return this.elements[_index(this, index)]
+
+def _set(interpreter, this : PyLoxList, index : object, value : object) -> object:
+    this.elements[_index(this, index)] = value
+    return value #allows cascading values, as an assignment
+
+def _len(interpreter, this : PyLoxList) -> float:
+    return float(len(this.elements))
+
+def _pop(interpreter, this : PyLoxList) -> object:
+    #removes and returns the last element
+    if not this.elements :
+        raise PyLoxRuntimeError(None, "Can't pop from an empty list.")
+    return this.elements.pop()
+
+def _slice(interpreter, this : PyLoxList, start : object, end : object) -> PyLoxList:
+    #returns a new list of the elements from start to end, excluded, both bounds are clamped to the list
+    if not _isInteger(start) or not _isInteger(end) :
+        raise PyLoxRuntimeError(None, "Slice bounds must be integers.")
+    return PyLoxList(this._klass, this.elements[max(int(start), 0) : max(int(end), 0)])
+
+def _sort(interpreter, this : PyLoxList) -> None:
+    #sorts the elements in place, in ascending order
+    elements = this.elements
+    if all(type(element) is float for element in elements) :
+        elements.sort()
+    elif all(type(element) is str or type(element) is Rope for element in elements) :
+        elements.sort(key = str)
+    else :
+        raise PyLoxRuntimeError(None, "Can only sort lists of numbers or lists of strings.")
+
+def _indexOf(interpreter, this : PyLoxList, value : object) -> float:
+    #returns the index of the first element equal to value, or -1
+    isEqual = interpreter._isEqual
+    for index, element in enumerate(this.elements) :
+        if isEqual(element, value) : return float(index)
+    return -1.0
+
+def _isInteger(value : object) -> bool:
+    return type(value) is float and value.is_integer()
+
+def _index(this : PyLoxList, index : object) -> int:
+    if not _isInteger(index) :
+        raise PyLoxRuntimeError(None, "List index must be an integer.")
+    if index < 0 or index >= len(this.elements) :
+        raise PyLoxRuntimeError(None, "List index out of range.")
+    return int(index)
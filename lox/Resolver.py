@@ -38,6 +38,26 @@ class Stack :
     def isEmpty(self) -> bool: 
         return len(self) == 0
 
+class Scope(dict) :
+    #maps each name declared in a scope to its state : declared (False) or defined (True)
+    #names are numbered in declaration order, giving their slots in the runtime Environment
+    def __init__(self) :
+        super().__init__()
+        self.slots = {}
+        self.size = 0           #slots of the scope, more than its names when a declaration shadows a parameter
+        self.parameters = set() #parameters that a declaration of the function body can still shadow
+        self.crossings = []     #resolved references to variables of the enclosing scopes
+    
+    def declare(self, name : str) -> None:
+        #a name declared again, to shadow a parameter, gets a slot of its own
+        self[name] = False
+        self.slots[name] = self.size
+        self.size += 1
+        self.parameters.discard(name)
+    
+    def define(self, name : str) -> None:
+        self[name] = True
+
 class StmtType :
     NONE, LOOP = range(2)
 
@@ -64,12 +84,18 @@ class Resolver :
         
     def _beginScope(self) -> None:
         #enters into a new scope
-        self._scopes.push({})
+        self._scopes.push(Scope())
     
-    def _endScope(self) -> None:
+    def _endScope(self, keep : bool = True) -> None:
         #exit from the current scope
         #returns to a outer scope
-        self._scopes.pop()
+        scope = self._scopes.pop()
+        
+        if not keep :
+            #a scope without declarations has no runtime Environment, 
+            #so the references that crossed it are one scope closer to their variables
+            for expr in scope.crossings :
+                expr.depth -= 1
     
     def Resolve(self, what : {Stmt, Expr}) -> None:
         #Resolve all variable references
@@ -79,10 +105,12 @@ class Resolver :
             self._beginScope()
             for stmt in what.statements :
                 self.Resolve(stmt)
-            self._endScope(); return
+            what.size = self._scopes.top().size
+            self._endScope(keep = what.size > 0); return
         
         elif isinstance(what, Stmt.Var) :
             self._declare(what.name)
+            what.slot = self._slot(what.name)
             if what.initializer is not None :
                 self.Resolve(what.initializer)
             self._define(what.name); return
@@ -92,6 +120,7 @@ class Resolver :
             #in the surronding scope where the function is declared
             self._declare(what.name)
             self._define(what.name)
+            what.slot = self._slot(what.name)
             
             self._resolveFunction(what, FunctionType.FUNCTION); return
         
@@ -105,6 +134,7 @@ class Resolver :
             #allow to reference itself inside methods
             self._declare(what.name) 
             self._define(what.name)
+            what.slot = self._slot(what.name)
             
             try :
                 if what.supercls and what.name.lexeme == what.supercls.name.lexeme :
@@ -116,17 +146,15 @@ class Resolver :
                 self._currentCls = ClassType.SUBCLASS #allows references to 'super'
                 self.Resolve(what.supercls)
                 self._beginScope() #begin a scope to define 'super'
-                self._scopes.top()["super"] = True
-            
-            self._beginScope() #begin a scope to define 'this'
-            self._scopes.top()["this"] = True
+                self._scopes.top().declare("super")
+                self._scopes.top().define("super")
             
+            #'this' is defined in the scope of each method
             for method in what.methods :
                 methodName = method.name.lexeme
                 self._resolveFunction(method, FunctionType.INITIALIZER if methodName == "init" 
                                          else FunctionType.METHOD)
 
-            self._endScope(); #pop scope where 'this' is defined
             if what.supercls is not None :
                 self._endScope() #pop scope where the superclass is defined
                 
@@ -159,6 +187,8 @@ class Resolver :
             else :
                 if what.value is not None : 
                     self.Resolve(what.value)
+                #the function has nothing left to do after a returned call
+                what.isTailCall = isinstance(what.value, Expr.Call)
             return
         
         elif isinstance(what, Stmt.Break) or isinstance(what, Stmt.Continue):
@@ -177,6 +207,21 @@ class Resolver :
             self.Resolve(what.body)
             self._currentScope = current; return
         
+        elif isinstance(what, Stmt.For) :
+            #the initializer declares its variables in a scope around the loop
+            self._beginScope()
+            if what.initializer is not None : self.Resolve(what.initializer)
+            
+            current = self._currentScope
+            self._currentScope = StmtType.LOOP
+            if what.condition is not None : self.Resolve(what.condition)
+            if what.increment is not None : self.Resolve(what.increment)
+            self.Resolve(what.body)
+            self._currentScope = current
+            
+            what.size = self._scopes.top().size
+            self._endScope(keep = what.size > 0); return
+        
         elif isinstance(what, Stmt.Expression) :
             self.Resolve(what.expression); return
         
@@ -269,19 +314,26 @@ class Resolver :
     def _declare(self, name : Token) -> None:
         if self._scopes.isEmpty() : return
         try :
-            if name.lexeme in self._scopes.top() :
+            scope = self._scopes.top()
+            if name.lexeme in scope and name.lexeme not in scope.parameters :
                 raise PyLoxStaticError(name, "Another variable with this name is already declared in this scope.")
         
         except PyLoxStaticError as error :
             self._hadError = True
             error.what()
         else :
-            self._scopes.top()[name.lexeme] = False
+            self._scopes.top().declare(name.lexeme)
     
     def _define(self, name : Token) -> None:
         if self._scopes.isEmpty() : return
         
-        self._scopes.top()[name.lexeme] = True
+        self._scopes.top().define(name.lexeme)
+    
+    def _slot(self, name : Token) -> int:
+        #returns the slot of a name declared in the current scope, or None in the global scope
+        if self._scopes.isEmpty() : return None
+        
+        return self._scopes.top().slots.get(name.lexeme)
     
     def _resolveLocal(self, expr : Expr, name : Token) :
         #from innermost scope to outward, looks for a matching name
@@ -290,20 +342,42 @@ class Resolver :
         #iterate through the scopes in range [start, stop) by decrementing 1 for each step
         #scope_distance defines the distance between the current and the global scope
         for scope_distance in range(start, stop, -1) :
-            if name.lexeme in self._scopes[scope_distance] :
-                self._interpreter._resolve(expr, start - scope_distance); return
+            scope = self._scopes[scope_distance]
+            if name.lexeme in scope :
+                #the resolved variable is stored in the node itself
+                expr.depth = start - scope_distance
+                expr.slot = scope.slots[name.lexeme]
+                
+                for crossed in range(scope_distance + 1, start + 1) :
+                    self._scopes[crossed].crossings.append(expr)
+                return
+        
+        #not found in any local scope, so it is a global, even if it is defined later
+        expr.slot = self._interpreter.globals.slot(name.lexeme)
             
     def _resolveFunction(self, function : Stmt.Function, funType : FunctionType) :
         #Resolve functions and methods
         
         enclosingFun = self._currentFun
         self._currentFun = funType
+        enclosingScope = self._currentScope
+        self._currentScope = StmtType.NONE #break and continue cannot leave the function
         
+        #parameters and body declarations share a single scope, so each call has a single environment
         self._beginScope()
+        if funType == FunctionType.METHOD or funType == FunctionType.INITIALIZER :
+            #methods receive the instance before their arguments, so 'this' is always the first slot
+            self._scopes.top().declare("this")
+            self._scopes.top().define("this")
         for param in function.params :
             self._declare(param)
             self._define(param)
-        self.Resolve(function.body)
+        #as in a block of its own, the body can declare a variable with the name of a parameter
+        self._scopes.top().parameters.update(param.lexeme for param in function.params)
+        for stmt in function.body.statements :
+            self.Resolve(stmt)
+        function.size = self._scopes.top().size
         self._endScope()
         
         self._currentFun = enclosingFun
+        self._currentScope = enclosingScope
@@ -0,0 +1,57 @@
+__all__ = ["Rope", "concatenate"]
+
+"""
+    A Rope is a Lox string made by concatenation, which keeps its pieces instead of copying them into a new string.
+    The pieces are kept in a list that a rope shares with the ropes made by appending to it :
+    a rope owns the first pieces of the list, and appending to the rope that owns the whole list adds a piece in place,
+    so building a string in a loop, as in 's = s + x;', takes a linear time instead of a quadratic one.
+    A rope is flattened into a single string only when its text is needed : to print it, to compare it or to hash it.
+    Concatenations shorter than Rope.THRESHOLD characters still make an ordinary string.
+"""
+
+class Rope :
+    __slots__ = ("_parts", "_count", "_length")
+
+    THRESHOLD = 256 #length from which a concatenation makes a rope
+
+    def __init__(self, parts : list, length : int) :
+        self._parts = parts         #pieces of the text, shared with the ropes made by appending to this one
+        self._count = len(parts)    #leading pieces of the list that belong to this rope
+        self._length = length       #characters of the text
+
+    def append(self, text : str) -> "Rope":
+        #returns the rope of this text followed by text
+        parts = self._parts
+        if len(parts) != self._count :
+            #another rope was already appended to this one, its pieces are left as they are
+            parts = parts[:self._count]
+        parts.append(text)
+        return Rope(parts, self._length + len(text))
+
+    def __str__(self) -> str:
+        if self._count > 1 :
+            #joins the pieces once, the flattened text replaces them in this rope
+            self._parts = ["".join(self._parts[:self._count])]
+            self._count = 1
+        return self._parts[0]
+
+    def __eq__(self, other : object) -> bool:
+        if type(other) is Rope or type(other) is str :
+            #texts of different lengths differ without being flattened
+            return len(self) == len(other) and str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __len__(self) -> int:
+        return self._length
+
+def concatenate(left : object, right : object) -> object:
+    #returns the concatenation of two strings or ropes, as a rope if it is long enough
+    if type(left) is Rope :
+        return left.append(str(right))
+
+    if type(right) is Rope : right = str(right)
+    if len(left) + len(right) < Rope.THRESHOLD : return left + right
+    return Rope([left, right], len(left) + len(right))
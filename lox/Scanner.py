@@ -1,3 +1,4 @@
+import re
 from .Token import *
 from .TokenType import *
 from .PyLoxExceptions import PyLoxScanError
@@ -34,29 +35,147 @@ class Scanner(object) :
         "while"    : TokenType.WHILE
     }
     
-    def __init__(self, source : str) :
+    #PyLox operators and punctuation
+    _operators = {
+        "!="  : TokenType.BANG_EQUAL,
+        "=="  : TokenType.EQUAL_EQUAL,
+        "<="  : TokenType.LESS_EQUAL,
+        ">="  : TokenType.GREATER_EQUAL,
+        "("   : TokenType.LEFT_PAREN,
+        ")"   : TokenType.RIGHT_PAREN,
+        "{"   : TokenType.LEFT_BRACE,
+        "}"   : TokenType.RIGHT_BRACE,
+        ","   : TokenType.COMMA,
+        "."   : TokenType.DOT,
+        ";"   : TokenType.SEMICOLON,
+        "-"   : TokenType.MINUS,
+        "+"   : TokenType.PLUS,
+        "*"   : TokenType.STAR,
+        "%"   : TokenType.MOD,
+        "/"   : TokenType.SLASH,
+        "?"   : TokenType.QUESTION_MARK,
+        ":"   : TokenType.COLON,
+        "!"   : TokenType.BANG,
+        "="   : TokenType.EQUAL,
+        "<"   : TokenType.LESS,
+        ">"   : TokenType.GREATER
+    }
+    
+    #master pattern of the fast mode: every character of the buffer belongs to exactly one match,
+    #with alternatives catching unterminated strings and comments, and unexpected characters
+    _lexemes = re.compile("|".join([
+        r'(?P<space>[ \t\r\n]+)',
+        r'(?P<comment>//[^\n]*|/\*.*?\*/)',
+        r'(?P<string>"[^"]*")',
+        r'(?P<number>\d+(?:\.\d+)?)',
+        r'(?P<identifier>\w+)',
+        r'(?P<unterminated>/\*|")',
+        #longest lexemes first, so that '==' is not matched as two '='
+        r'(?P<operator>{})'.format("|".join(re.escape(operator) for operator in sorted(_operators, key = len, reverse = True))),
+        r'(?P<unexpected>.)'
+    ]), re.DOTALL)
+    
+    def __init__(self, source : str, fast : bool = True) :
+        if not fast and not isinstance(source, str) : 
+            source = "".join(source) #the character by character scanning needs the whole buffer
+        
+        self._fast = fast       # scans with the master pattern, instead of character by character
         self._hadError = False  # defines the error state of Scanner
         self._line = 1          # works as a pointer to the current line in the buffer
         self._start = 0         # works as a pointer to the beginning of a token 
         self._current = 0       # works as a pointer to the end of a token
-        self._source = source   # character buffer to be tokenized
-        self._tokens = []       # final list of tokens
+        self._source = source   # character buffer to be tokenized, or an iterable of its chunks
+        self._tokens = []       # tokens scanned, but not yielded yet
     
     def Tokenize(self) -> list:
         #breaks the character buffer into a list of tokens
         
         try :
-            while not self._isAtEnd() :
-                self._scanToken()
+            return list(self.Scan())
         
         except PyLoxScanError as error :
             self._hadError = True
-            error.what()        
+            error.what()
+    
+    def Scan(self) -> iter:
+        #yields the tokens of the character buffer one by one, as they are scanned
+        #raises PyLoxScanError at the first invalid token
+        
+        if self._fast : 
+            yield from self._scanFast(); return
+        
+        while not self._isAtEnd() :
+            self._scanToken()
+            if self._tokens :
+                yield self._tokens.pop()
+        
+        self._start = self._current        
+        self._addToken(TokenType.EOF)
+        yield self._tokens.pop()
+    
+    def _scanFast(self) -> iter:
+        #produces the same tokens of the character by character scanning, with the master pattern
+        keywords = Scanner._keywords
+        operators = Scanner._operators
+        line = 1
+        
+        if isinstance(self._source, str) :
+            buffer, chunks = self._source, None
         else :
-            self._start = self._current        
-            self._addToken(TokenType.EOF)
+            buffer, chunks = "", iter(self._source)
+        position = 0
+        
+        while True :
+            if chunks is not None :
+                #keeps the unscanned characters of the buffer, and appends the next chunk
+                chunk = next(chunks, "")
+                buffer = buffer[position:] + chunk
+                position = 0
+                if not chunk : chunks = None #the source is exhausted
+            
+            #while there are chunks to read, a match too close to the end of the buffer may continue in the next chunk
+            safe = len(buffer) - 2
+            
+            for match in Scanner._lexemes.finditer(buffer, position) :
+                kind = match.lastgroup
+                if chunks is not None and (match.end() > safe or kind == "unterminated") : break
+                
+                position = match.end()
+                lexeme = match.group()
+                
+                if kind == "space" :
+                    line += lexeme.count("\n")
+                
+                elif kind == "identifier" :
+                    if lexeme in keywords :
+                        yield Token(keywords[lexeme], lexeme, None, line)
+                    else :
+                        yield Token(TokenType.IDENTIFIER, lexeme, lexeme, line)
+                
+                elif kind == "operator" :
+                    yield Token(operators[lexeme], lexeme, None, line)
+                
+                elif kind == "number" :
+                    yield Token(TokenType.NUMBER, lexeme, float(lexeme), line)
+                
+                elif kind == "string" :
+                    line += lexeme.count("\n") #strings are reported at their last line
+                    yield Token(TokenType.STRING, lexeme, lexeme[1:-1], line)
+                
+                elif kind == "comment" :
+                    line += lexeme.count("\n")
+                
+                elif kind == "unterminated" :
+                    line += buffer.count("\n", match.start())
+                    raise PyLoxScanError(line, "Unterminated String." if lexeme == '"' else "Unterminated Comment.")
+                
+                else :
+                    raise PyLoxScanError(line, "Unexpected character '{}'".format(lexeme))
+            
+            if chunks is None : break
         
-            return self._tokens
+        self._line = line
+        yield Token(TokenType.EOF, "", None, line)
         
     def _scanToken(self) -> None:
         self._skipWhiteSpaces() #ignore white space characters
@@ -109,7 +228,7 @@ class Scanner(object) :
     
     def _string(self) -> None: 
         while self._peek() != '"' and not self._isAtEnd() :
-            if self._peek() == "\n" : self._increment_line()
+            if self._peek() == "\n" : self._incrementLine()
             self._advance()
             
         if self._isAtEnd() :
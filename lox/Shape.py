@@ -0,0 +1,23 @@
+__all__ = ["Shape"]
+
+"""
+    A Shape describes the layout of the fields of instances : the slot of each field name in their list of values.
+    Instances created with the same fields, in the same order, share the same shapes.
+    Each class has its own empty shape, so the shape of an instance also identifies its class.
+"""
+
+class Shape :
+    __slots__ = ("slots", "_transitions")
+
+    def __init__(self, slots : dict = None) :
+        self.slots = {} if slots is None else slots #slot of each field name
+        self._transitions = {} #shape reached by adding each new field name to this one
+
+    def transition(self, name : str) -> "Shape":
+        #returns the shape of an instance of this shape, after a field called name is added
+        shape = self._transitions.get(name)
+        if shape is None :
+            slots = dict(self.slots)
+            slots[name] = len(slots)
+            shape = self._transitions[name] = Shape(slots)
+        return shape
@@ -1,49 +1,71 @@
 from . import Expr
 from . import Token
 
-class Stmt(object) : pass
+class Stmt(object) :
+    __slots__ = ()
 
 class Block(Stmt) :
+    __slots__ = ("statements", "size")
+    
     #block -> "{" statements "}"
     def __init__(self, statements : list) :
-        self.statements = statements
+        self.statements = tuple(statements) #a tuple has no spare capacity, unlike the parsed list
+        self.size = 0 #number of variables declared in the block, given by the Resolver, without a scope of its own if 0
 
 class Class(Stmt) :
+    __slots__ = ("name", "supercls", "methods", "slot")
+    
     #class -> class <name> "{" function* "}"
     def __init__(self, name : Token, superclass : Expr.Variable, methods : list) :
         self.name = name
         self.supercls = superclass
-        self.methods = methods
+        self.methods = tuple(methods)
+        self.slot = None #slot of the class name given by the Resolver, None for a global class
     
 class Expression(Stmt) :
+    __slots__ = ("expression",)
+    
     #expression -> Unary | Binary | Grouping | Literal | Logical | Variable | Assign | Call
     def __init__(self, expr : Expr) :
         self.expression = expr
 
 class Function(Stmt) :
+    __slots__ = ("name", "params", "body", "slot", "size")
+    
     #function -> fun <name>(params) body
     def __init__(self, name : Token, params : list, body : Block) :
         self.name = name
-        self.params = params
+        self.params = tuple(params)
         self.body = body
+        self.slot = None #slot of the function name given by the Resolver, None for a global function
+        self.size = 0    #number of variables of a call, the parameters followed by the body declarations
         
 class Return(Stmt) :
+    __slots__ = ("keyword", "value", "isTailCall")
+    
     #return -> return <expression>;
     def __init__(self, keyword : Token, value : Expr) :
         self.keyword = keyword
         self.value = value
+        self.isTailCall = False #the value is a call that can reuse the call of the function, given by the Resolver
 
 class Break(Stmt) : 
+    __slots__ = ("keyword",)
+    
     #break -> "break" ";"
     def __init__(self, keyword : Token) :
         self.keyword = keyword
 
 class Continue(Stmt) : 
+    __slots__ = ("keyword",)
+    
     #continue -> "continue" ";"
     def __init__(self, keyword : Token) :
         self.keyword = keyword
 
 class If(Stmt) :
+    __slots__ = ("condition", "thenBranch", "elseBranch")
+    
     #if -> if(condition) thenBranch; else elseBranch;
     def __init__(self, condition : Expr, thenBranch : Stmt, elseBranch : Stmt) :
         self.condition = condition
@@ -51,19 +73,37 @@ class If(Stmt) :
         self.elseBranch = elseBranch
 
 class While(Stmt) :
+    __slots__ = ("condition", "body")
+    
     #while -> while(condition) statement;
     def __init__(self, condition : Expr, body : Stmt) :
         self.condition = condition
         self.body = body
 
+class For(Stmt) :
+    __slots__ = ("initializer", "condition", "increment", "body", "size")
+    
+    #for -> for(initializer; condition; increment) statement;
+    def __init__(self, initializer : Stmt, condition : Expr, increment : Expr, body : Stmt) :
+        self.initializer = initializer #None, or a Var or an Expression statement
+        self.condition = condition     #None for a loop without condition
+        self.increment = increment
+        self.body = body
+        self.size = 0 #number of variables declared by the initializer, given by the Resolver, without a scope of its own if 0
+
 class Print(Stmt) :
+    __slots__ = ("expression",)
+    
     #print -> print <expression>;
     def __init__(self, expr : Expr) :
         self.expression = expr
 
 class Var(Stmt) :
+    __slots__ = ("name", "initializer", "slot")
+    
     #var -> var <name> = initializer;
     def __init__(self, name : Token, initializer : Expr) :
         self.name = name
         self.initializer = initializer
+        self.slot = None #slot given by the Resolver, None for a global variable
 
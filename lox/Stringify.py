@@ -0,0 +1,21 @@
+__all__ = ["stringify"]
+
+"""
+    The text of Lox values, as printed by the print statement, by the prompt and inside the elements of a list.
+"""
+
+def stringify(obj : object) -> str:
+    #returns a string representation (str) for the object
+    
+    if obj == None : return "nil"
+    
+    elif isinstance(obj, float) :
+        text = str(obj)
+        #discards zeroed mantissa
+        return (text[:-2] if text[-2:] == ".0" else text)
+    
+    elif obj == True : return "true"
+    
+    elif obj == False : return "false"
+    
+    return str(obj)
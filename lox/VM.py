@@ -0,0 +1,374 @@
+import sys
+from .Token import *
+from .PyLoxExceptions import PyLoxRuntimeError
+from .Environment import *
+from .Callable import *
+from .PyLoxFunction import *
+from .PyLoxClass import *
+from .PyLoxInstance import *
+from .Compiler import *
+from .Interpreter import Interpreter, _toEcho
+
+__all__ = ["VM", "VMFunction"]
+
+"""
+    The VM is a stack machine, that runs the bytecode emitted by the Compiler.
+    Expressions push their values on an operand stack, while variables live in the same
+    environments used by the Interpreter, addressed by the depth and slot given by the Resolver.
+"""
+
+#instructions are bound to module names, which are cheaper to look up than class attributes
+GET_LOCAL, SET_LOCAL, DEFINE_LOCAL = OpCode.GET_LOCAL, OpCode.SET_LOCAL, OpCode.DEFINE_LOCAL
+GET_GLOBAL, SET_GLOBAL, DEFINE_GLOBAL = OpCode.GET_GLOBAL, OpCode.SET_GLOBAL, OpCode.DEFINE_GLOBAL
+CONSTANT, NIL, TRUE, FALSE, POP = OpCode.CONSTANT, OpCode.NIL, OpCode.TRUE, OpCode.FALSE, OpCode.POP
+ADD, SUBTRACT, MULTIPLY, DIVIDE, MODULO = OpCode.ADD, OpCode.SUBTRACT, OpCode.MULTIPLY, OpCode.DIVIDE, OpCode.MODULO
+EQUAL, NOT_EQUAL, GREATER, GREATER_EQUAL, LESS, LESS_EQUAL = OpCode.EQUAL, OpCode.NOT_EQUAL, OpCode.GREATER, OpCode.GREATER_EQUAL, OpCode.LESS, OpCode.LESS_EQUAL
+NEGATE, NOT = OpCode.NEGATE, OpCode.NOT
+JUMP, JUMP_IF_FALSE, AND, OR, LOOP = OpCode.JUMP, OpCode.JUMP_IF_FALSE, OpCode.AND, OpCode.OR, OpCode.LOOP
+CALL, INVOKE, RETURN, FUNCTION, CLASS = OpCode.CALL, OpCode.INVOKE, OpCode.RETURN, OpCode.FUNCTION, OpCode.CLASS
+TAIL_CALL, TAIL_INVOKE = OpCode.TAIL_CALL, OpCode.TAIL_INVOKE
+GET_PROPERTY, GET_METHOD = OpCode.GET_PROPERTY, OpCode.GET_METHOD
+CHECK_FIELDS, SET_PROPERTY, GET_SUPER = OpCode.CHECK_FIELDS, OpCode.SET_PROPERTY, OpCode.GET_SUPER
+PUSH_SCOPE, POP_SCOPE, PRINT, ECHO = OpCode.PUSH_SCOPE, OpCode.POP_SCOPE, OpCode.PRINT, OpCode.ECHO
+UNDEFINED = GlobalEnvironment.UNDEFINED
+
+class VMFunction(PyLoxFunction) :
+    def __init__(self, declaration, closure : Environment, isInitializer : bool, chunk : Chunk, isMethod : bool = False) :
+        super().__init__(declaration, closure, isInitializer, isMethod)
+        self.chunk = chunk #compiled function body
+
+    def call(self, vm, args : list) -> object:
+        #same semantics of PyLoxFunction.call, but running the compiled function body
+        return vm.run(self.chunk, Environment(self.closure, args + self._locals), args[0] if self._isInitializer else None)
+
+class VM(Interpreter) :
+    maxDepth = 100000   #Lox calls that can be active at once, beyond it the call is a stack overflow
+    inlineCalls = True  #Lox calls run in frames of the running loop, instead of nesting a Python call
+
+    def __init__(self, isPromptSession : bool = False) :
+        super().__init__(isPromptSession)
+        self._compiler = Compiler(_toEcho)
+
+    def Interpret(self, statements : list) -> bool:
+        #compiles and runs each top-level statement
+        try :
+            for statement in statements :
+                self.run(self._compiler.compile(statement), self.globals)
+
+        except PyLoxRuntimeError as error :
+            self._hadError = True
+            error.what()
+            return False
+
+        return True
+
+    def run(self, chunk : Chunk, env, initialized = None) -> object:
+        #runs the instructions of chunk in the environment env, until its RETURN instruction,
+        #initialized is the instance returned by an init method.
+        #the Lox functions called meanwhile run in this loop too : the frame of each caller is kept in frames,
+        #so the depth of the Lox calls is not limited by the Python stack
+        code = chunk.code
+        constants = chunk.constants
+        globalSlots = self.globals._slots
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        ip = 0
+        frames = [] #chunk, resume offset, environment, stack and initialized instance of each caller
+        inlineCalls = self.inlineCalls
+
+        while True :
+            op = code[ip]
+
+            if op == GET_LOCAL :
+                depth = code[ip + 1]
+                environment = env
+                while depth :
+                    environment = environment.enclosing; depth -= 1
+                push(environment._slots[code[ip + 2]])
+                ip += 3
+
+            elif op == CONSTANT :
+                push(constants[code[ip + 1]])
+                ip += 2
+
+            elif op == ADD :
+                right = pop(); left = pop()
+                if type(left) is float and type(right) is float : push(left + right)
+                else : push(self._addOrConcatenate(chunk.tokens[ip], left, right))
+                ip += 1
+
+            elif op == SUBTRACT :
+                right = pop(); left = pop()
+                if type(left) is float and type(right) is float : push(left - right)
+                else : push(self._minus(chunk.tokens[ip], left, right))
+                ip += 1
+
+            elif op == LESS :
+                right = pop(); left = pop()
+                if type(left) is float and type(right) is float : push(left < right)
+                else : push(self._less(chunk.tokens[ip], left, right))
+                ip += 1
+
+            elif op <= LESS_EQUAL and op >= ADD :
+                #the remaining binary operators are dispatched by their token
+                right = pop(); left = pop()
+                token = chunk.tokens[ip]
+                push(self._binaryOperations[token.tokenValue](self, token, left, right))
+                ip += 1
+
+            elif op == JUMP_IF_FALSE :
+                value = pop()
+                if value is None or value is False :
+                    ip += code[ip + 1] + 2
+                else :
+                    ip += 2
+
+            elif op <= TAIL_INVOKE and op >= CALL :
+                argCount = code[ip + 1]
+                if op == CALL or op == TAIL_CALL :
+                    if argCount :
+                        args = stack[-argCount:]
+                        del stack[-argCount:]
+                    else :
+                        args = []
+                    function = pop()
+                    if not isinstance(function, Callable) :
+                        raise PyLoxRuntimeError(chunk.tokens[ip], "Can only call functions and classes.")
+                else :
+                    start = len(stack) - argCount - 1
+                    if stack[start] is None :
+                        #not a method, the callee was a field of the instance
+                        args = stack[start + 1:]
+                        del stack[start:]
+                        function = pop()
+                        if not isinstance(function, Callable) :
+                            raise PyLoxRuntimeError(chunk.tokens[ip], "Can only call functions and classes.")
+                    else :
+                        args = stack[start:] #the instance is the first argument of a method
+                        del stack[start:]
+                        function = pop()
+
+                if argCount != function.arity() :
+                    raise PyLoxRuntimeError(chunk.tokens[ip], "Expect {} arguments, but got {}.".format(function.arity(), argCount))
+
+                if inlineCalls :
+                    if type(function) is PyLoxBoundMethod :
+                        args.insert(0, function.instance)
+                        function = function.method
+                    elif type(function) is PyLoxClass :
+                        instance = PyLoxInstance(function)
+                        initializer = function.findMethod("init")
+                        if initializer is None :
+                            push(instance); ip += 2; continue
+                        args.insert(0, instance)
+                        function = initializer
+
+                if inlineCalls and type(function) is VMFunction :
+                    if op < TAIL_CALL :
+                        #the caller resumes after this instruction, when the function returns
+                        if len(frames) == self.maxDepth :
+                            raise PyLoxRuntimeError(chunk.tokens[ip], "Stack overflow.")
+                        frames.append((chunk, ip + 2, env, stack, initialized))
+                        stack = []
+                        push = stack.append
+                        pop = stack.pop
+                    #else the function takes the frame of the caller, which returns its value
+
+                    chunk = function.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    env = Environment(function.closure, args + function._locals)
+                    initialized = args[0] if function._isInitializer else None
+                    ip = 0
+                    continue
+
+                try :
+                    push(function.call(self, args))
+                except RecursionError :
+                    raise PyLoxRuntimeError(chunk.tokens[ip], "Stack overflow.") from None
+                except PyLoxRuntimeError as error :
+                    raise error.at(chunk.tokens[ip])
+                ip += 2 #a call in tail position is followed by a RETURN
+
+            elif op == RETURN :
+                #an init method can only return 'this', even with an empty return statement
+                value = pop() if initialized is None else initialized
+                if not frames : return value
+
+                chunk, ip, env, stack, initialized = frames.pop()
+                code = chunk.code
+                constants = chunk.constants
+                push = stack.append
+                pop = stack.pop
+                push(value)
+
+            elif op == SET_LOCAL :
+                env.assignAt(code[ip + 1], code[ip + 2], stack[-1])
+                ip += 3
+
+            elif op == POP :
+                pop()
+                ip += 1
+
+            elif op == GET_GLOBAL :
+                value = globalSlots[code[ip + 1]]
+                if value is UNDEFINED :
+                    raise PyLoxRuntimeError(chunk.tokens[ip], "Undefined name '{}'.".format(chunk.tokens[ip].lexeme))
+                push(value)
+                ip += 2
+
+            elif op == JUMP :
+                ip += code[ip + 1] + 2
+
+            elif op == LOOP :
+                ip -= code[ip + 1] - 2
+
+            elif op == GET_PROPERTY :
+                instance = pop()
+                if not isinstance(instance, PyLoxInstance) :
+                    raise PyLoxRuntimeError(chunk.tokens[ip], "Only instances have properties.")
+                cache = constants[code[ip + 1]]
+                if instance._shape is cache.shape : push(instance._values[cache.entry])
+                else : push(cache.get(instance))
+                ip += 2
+
+            elif op == GET_METHOD :
+                instance = pop()
+                if not isinstance(instance, PyLoxInstance) :
+                    raise PyLoxRuntimeError(chunk.tokens[ip], "Only instances have properties.")
+                cache = constants[code[ip + 1]]
+                method = cache.entry if instance._shape is cache.shape else cache.findMethod(instance)
+                if method is None :
+                    push(instance.get(cache.name)); push(None) #a field holding a callable, or an undefined property
+                else :
+                    push(method); push(instance)
+                ip += 2
+
+            elif op == CHECK_FIELDS :
+                if not isinstance(stack[-1], PyLoxInstance) :
+                    raise PyLoxRuntimeError(chunk.tokens[ip], "Only instances have fields.")
+                ip += 2
+
+            elif op == SET_PROPERTY :
+                value = pop()
+                instance = pop()
+                cache = constants[code[ip + 1]]
+                if instance._shape is cache.shape :
+                    instance._values[cache.entry] = value
+                else :
+                    cache.set(instance, value)
+                push(value)
+                ip += 2
+
+            elif op == PUSH_SCOPE :
+                env = Environment(env, [None] * code[ip + 1])
+                ip += 2
+
+            elif op == POP_SCOPE :
+                env = env.enclosing
+                ip += 1
+
+            elif op == DEFINE_LOCAL :
+                env._slots[code[ip + 1]] = pop()
+                ip += 2
+
+            elif op == DEFINE_GLOBAL :
+                env.define(constants[code[ip + 1]], pop())
+                ip += 2
+
+            elif op == NIL :
+                push(None)
+                ip += 1
+
+            elif op == TRUE :
+                push(True)
+                ip += 1
+
+            elif op == FALSE :
+                push(False)
+                ip += 1
+
+            elif op == NOT :
+                value = pop()
+                push(value is None or value is False)
+                ip += 1
+
+            elif op == NEGATE :
+                value = pop()
+                if not isinstance(value, float) :
+                    raise PyLoxRuntimeError(chunk.tokens[ip], "All operands must be numbers.")
+                push(-value)
+                ip += 1
+
+            elif op == AND :
+                value = stack[-1]
+                if value is None or value is False :
+                    ip += code[ip + 1] + 2
+                else :
+                    pop()
+                    ip += 2
+
+            elif op == OR :
+                value = stack[-1]
+                if value is not None and value is not False :
+                    ip += code[ip + 1] + 2
+                else :
+                    pop()
+                    ip += 2
+
+            elif op == PRINT :
+                sys.stdout.write(self._stringify(pop()) + "\n")
+                ip += 1
+
+            elif op == ECHO :
+                value = pop()
+                if self.isPromptSession :
+                    print(self._stringify(value)) #echoes to the prompt
+                ip += 1
+
+            elif op == SET_GLOBAL :
+                try :
+                    self.globals.assignSlot(code[ip + 1], chunk.tokens[ip], stack[-1])
+                except PyLoxRuntimeError as error :
+                    #attempt to assign to an undefined variable
+                    self._hadError = True
+                    error.what()
+                ip += 2
+
+            elif op == FUNCTION :
+                proto = constants[code[ip + 1]]
+                push(VMFunction(proto.declaration, env, False, proto.chunk))
+                ip += 2
+
+            elif op == GET_SUPER :
+                superclass = env.getAt(code[ip + 1], code[ip + 2])
+                #'this' is always bound right inside the environment in which 'super' is stored
+                thisObject = env.getAt(code[ip + 1] - 1, 0)
+                method = constants[code[ip + 3]]
+
+                function = superclass.findMethod(method.lexeme)
+                if function is None :
+                    raise PyLoxRuntimeError(method, "Undefined property '{}'.".format(method.lexeme))
+                push(function.bind(thisObject))
+                ip += 4
+
+            elif op == CLASS :
+                proto = constants[code[ip + 1]]
+                statement = proto.declaration
+
+                scope = env
+                superclass = None
+                if statement.supercls is not None :
+                    superclass = pop()
+                    if not isinstance(superclass, PyLoxClass) :
+                        raise PyLoxRuntimeError(statement.supercls.name,
+                                    "Superclass of '{}' must be a class.".format(statement.name.lexeme))
+                    scope = Environment(env, [superclass]) #super is defined in the class scope
+
+                methods = {}
+                for method in proto.methods :
+                    methods[method.declaration.name.lexeme] = VMFunction(method.declaration, scope,
+                                                                         method.isInitializer, method.chunk, True)
+                push(PyLoxClass(statement.name.lexeme, superclass, methods))
+                ip += 2
@@ -0,0 +1,85 @@
+"""
+    Checks the cache of resolved scripts, kept in __ploxcache__ : a script runs the same whether its cache is missed,
+    hit or invalidated. A miss stores the cache, a hit leaves it as it is, and a change of the script,
+    or a corrupted cache, makes a new one. A script with an error, or run with --no-cache, is not cached.
+
+    usage : python3 tests/cache.py
+"""
+import os
+import sys
+import tempfile
+import subprocess
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_engines = ["tree", "closure", "vm"]
+
+_script = """var greeting = "hello";
+fun greet(name) { return greeting + " " + name; }
+class Counter {
+    init() { this.count = 0; }
+    add() { this.count = this.count + 1; return this; }
+}
+print greet("{}");
+print Counter().add().add().count;
+"""
+
+def run(path : str, engine : str, options : list = ()) -> tuple:
+    #returns the exit status and the output of the script at path
+    result = subprocess.run([sys.executable, os.path.join(_root, "PyLox.py"), "--engine=" + engine] + list(options) + [path],
+                            stdout = subprocess.PIPE, stderr = subprocess.STDOUT, universal_newlines = True)
+    return result.returncode, result.stdout
+
+def stamp(path : str) -> tuple:
+    #identifies the cache file at path, which is replaced by a new file whenever it is stored again
+    if not os.path.exists(path) : return None
+    status = os.stat(path)
+    return status.st_ino, status.st_mtime_ns
+
+def write(path : str, text : str) -> None:
+    with open(path, "w") as writer :
+        writer.write(text)
+
+def check(directory : str, engine : str) -> str:
+    #returns None if the cache behaves as expected with the engine, or the step that failed
+    path = os.path.join(directory, engine + ".plox")
+    cached = os.path.join(directory, "__ploxcache__", engine + ".ploxc")
+
+    write(path, _script.replace("{}", "world"))
+    if run(path, engine, ["--no-cache"]) != (0, "hello world\n2\n") : return "run without cache"
+    if stamp(cached) is not None : return "cache stored with --no-cache"
+
+    if run(path, engine) != (0, "hello world\n2\n") : return "miss"
+    first = stamp(cached)
+    if first is None : return "cache not stored on a miss"
+
+    if run(path, engine) != (0, "hello world\n2\n") : return "hit"
+    if stamp(cached) != first : return "cache stored again on a hit"
+
+    write(path, _script.replace("{}", "cache"))
+    if run(path, engine) != (0, "hello cache\n2\n") : return "invalidation, the old tree was run"
+    second = stamp(cached)
+    if second == first : return "cache not stored again after a change"
+
+    with open(cached, "r+b") as writer :
+        writer.seek(-16, os.SEEK_END)
+        writer.write(b"\0" * 16)
+    corrupted = stamp(cached)
+    if run(path, engine) != (0, "hello cache\n2\n") : return "corrupted cache"
+    if stamp(cached) == corrupted : return "corrupted cache not stored again"
+
+    write(path, _script.replace("{}", "error") + "print ;\n")
+    os.remove(cached)
+    status, output = run(path, engine)
+    if status != 65 or "hello" in output : return "script with a syntax error"
+    if stamp(cached) is not None : return "script with a syntax error cached"
+    return None
+
+if __name__ == "__main__" :
+    failed = False
+    with tempfile.TemporaryDirectory() as directory :
+        for engine in _engines :
+            error = check(directory, engine)
+            failed = failed or error is not None
+            print("{:<10} {:<8} {}".format("cache", engine, "ok" if error is None else "failed : " + error))
+
+    if failed : sys.exit(1)
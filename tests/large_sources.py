@@ -0,0 +1,46 @@
+"""
+    Runs generated scripts larger than the sources written by hand, in every engine :
+    a block of 12000 statements inside an if and a loop, whose jumps span more than 65535 words of bytecode,
+    and a function with 70000 different numeric constants. Every engine must print the expected result.
+
+    usage : python3 tests/large_sources.py
+"""
+import os
+import sys
+import tempfile
+import subprocess
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_engines = ["tree", "closure", "vm"]
+
+def longJumps(lines : int) -> tuple:
+    #returns a script whose if and while bodies have the given number of lines, and its output
+    body = "".join("    x = x + 1;\n" for _ in range(lines))
+    source = "var x = 0;\nif (x == 0) {\n" + body + "}\nprint x;\n"
+    source += "var i = 0;\nwhile (i < 2) {\n    i = i + 1;\n" + body + "}\nprint x;\n"
+    return source, "{}\n{}\n".format(lines, 3 * lines)
+
+def manyConstants(count : int) -> tuple:
+    #returns a script with a function adding count different numbers, and its output
+    body = "".join("    total = total + {};\n".format(n) for n in range(1, count + 1))
+    source = "fun sum() {\n    var total = 0;\n" + body + "    return total;\n}\nprint sum();\n"
+    return source, "{}\n".format(count * (count + 1) // 2)
+
+if __name__ == "__main__" :
+    failed = False
+    with tempfile.TemporaryDirectory() as directory :
+        for name, (source, expected) in (("jumps", longJumps(12000)), ("constants", manyConstants(70000))) :
+            path = os.path.join(directory, name + ".plox")
+            with open(path, "w") as writer :
+                writer.write(source)
+
+            for engine in _engines :
+                result = subprocess.run([sys.executable, os.path.join(_root, "PyLox.py"), "--no-cache",
+                                         "--engine=" + engine, path], stdout = subprocess.PIPE,
+                                         stderr = subprocess.PIPE, universal_newlines = True)
+                passed = result.returncode == 0 and result.stdout == expected
+                failed = failed or not passed
+                print("{:<10} {:<8} {}".format(name, engine, "ok" if passed else "failed : " +
+                                               " ".join((result.stdout + result.stderr).strip().splitlines()[-1:])))
+
+    if failed : sys.exit(1)
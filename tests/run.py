@@ -0,0 +1,84 @@
+"""
+    Runs the test scripts of this folder in every engine, and checks their output.
+
+    The output expected from a script is declared by its comments : every '//expect : <text>' is a line
+    that the script must print, in the same order, and '//exit : <status>' is the exit status of PyLox,
+    0 by default. '//options : <options>' gives options of PyLox to run the script with, such as --stream.
+    A script without any '//expect :' comment only has to end with the expected status.
+
+    usage : python3 tests/run.py [--engine=tree|closure|vm ...] [script.plox ...]
+
+    by default, it runs every tests/*.plox script in every engine.
+"""
+import os
+import re
+import sys
+import glob
+import subprocess
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_engines = ["tree", "closure", "vm"]
+
+def expectations(path : str) -> tuple:
+    #returns the lines that the script at path must print, its exit status and the options to run it with
+    lines = []
+    status = 0
+    options = []
+    with open(path, "r") as reader :
+        for line in reader :
+            match = re.search(r"//\s*expect\s*: ?(.*)$", line)
+            if match :
+                lines.append(match.group(1).rstrip())
+            match = re.search(r"//\s*exit\s*:\s*(\d+)", line)
+            if match :
+                status = int(match.group(1))
+            match = re.search(r"//\s*options\s*:(.*)$", line)
+            if match :
+                options.extend(match.group(1).split())
+    return lines, status, options
+
+def run(path : str, engine : str, options : list = ()) -> tuple:
+    #returns the exit status and the output lines of the script at path
+    result = subprocess.run([sys.executable, os.path.join(_root, "PyLox.py"), "--no-cache", "--engine=" + engine]
+                            + list(options) + [path], stdout = subprocess.PIPE, stderr = subprocess.STDOUT,
+                            universal_newlines = True)
+    return result.returncode, [line.rstrip() for line in result.stdout.splitlines()]
+
+def check(path : str, engine : str) -> str:
+    #returns None if the script runs as expected, or the reason of its failure
+    lines, status, options = expectations(path)
+    returncode, output = run(path, engine, options)
+
+    if lines and output != lines :
+        #reports the first line that differs, a missing line is shown as empty
+        count = max(len(lines), len(output))
+        for number, (expected, printed) in enumerate(zip(lines + [""] * count, output + [""] * count)) :
+            if expected != printed :
+                return "line {} : expected '{}', got '{}'".format(number + 1, expected, printed)
+    if returncode != status :
+        return "exit status {}, expected {} : {}".format(returncode, status, " ".join(output[-1:]))
+    return None
+
+if __name__ == "__main__" :
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    scripts = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+
+    engines = []
+    for option in options :
+        if option.startswith("--engine=") and option[len("--engine="):] in _engines :
+            engines.append(option[len("--engine="):])
+        else :
+            print("Usage run.py [--engine=tree|closure|vm ...] [script.plox ...]")
+            sys.exit(64)
+
+    if not scripts :
+        scripts = sorted(glob.glob(os.path.join(_root, "tests", "*.plox")))
+
+    failed = False
+    for path in scripts :
+        for engine in engines or _engines :
+            error = check(path, engine)
+            failed = failed or error is not None
+            print("{:<24} {:<8} {}".format(os.path.relpath(path, _root), engine, "ok" if error is None else "failed : " + error))
+
+    if failed : sys.exit(1)